@@ -14,6 +14,10 @@ def migrate():
         return
     
     conn = sqlite3.connect(db_path)
+    # 与后端引擎一致的 PRAGMA (见 app/db/database.py), 避免与运行中的服务争锁时立即报错
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.execute("PRAGMA synchronous=NORMAL")
     cursor = conn.cursor()
     
     # 检查字段是否已存在
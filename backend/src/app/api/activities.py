@@ -1,9 +1,11 @@
 """活动日志 API"""
 from typing import Optional
+import orjson
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.core.responses import success_response
+from app.db import get_db, uses_sqlite
 from app.schemas import ApiResponse
 from app.services import ActivityService
 
@@ -19,27 +21,32 @@ async def get_activities(
     db: AsyncSession = Depends(get_db),
 ):
     """获取活动日志列表"""
-    logs, total = await ActivityService.get_recent_activities(
-        db, limit=limit, offset=offset, action=action
-    )
+    if uses_sqlite(db):
+        # SQLite 直接产出每行 JSON, 原样嵌入响应
+        rows, total = await ActivityService.get_recent_activities_json(
+            db, limit=limit, offset=offset, action=action
+        )
+        logs = [orjson.Fragment(row) for row in rows]
+    else:
+        activities, total = await ActivityService.get_recent_activities(
+            db, limit=limit, offset=offset, action=action
+        )
+        logs = [
+            {
+                "id": log.id,
+                "action": log.action,
+                "player_name": log.player_name,
+                "operator": log.operator,
+                "submission_id": log.submission_id,
+                "note": log.note,
+                "created_at": log.created_at,
+            }
+            for log in activities
+        ]
     
-    return ApiResponse(
-        success=True,
-        data={
-            "logs": [
-                {
-                    "id": log.id,
-                    "action": log.action,
-                    "player_name": log.player_name,
-                    "operator": log.operator,
-                    "submission_id": log.submission_id,
-                    "note": log.note,
-                    "created_at": log.created_at.isoformat() if log.created_at else None,
-                }
-                for log in logs
-            ],
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-        }
-    )
+    return success_response(data={
+        "logs": logs,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    })
@@ -6,6 +6,7 @@
 - POST /internal/notifications/{id}/ack  插件回调: 标记已发, 回填 in_review_group
 """
 import secrets
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
@@ -13,22 +14,29 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
+from app.core.responses import success_response
 from app.schemas import ApiResponse
 from app.services import SubmissionService
 from app.services import bot_notify
 from app.core.config import get_settings
 
 
+@lru_cache(maxsize=1)
+def _token_bytes() -> bytes:
+    """配置的内部 token 的 UTF-8 字节 (插件轮询频繁, 配置进程内不变, 只编码一次)"""
+    return get_settings().internal.token.encode("utf-8")
+
+
 async def require_internal_token(
     x_internal_token: Optional[str] = Header(default=None, alias="X-Internal-Token"),
 ):
     """X-Internal-Token 常量时间比对。token 未配置或不匹配一律 401 (fail-closed)。"""
-    token = get_settings().internal.token
+    token = _token_bytes()
     # 转 bytes 比较: compare_digest 对含非 ASCII 的 str 会抛 TypeError -> 500; bytes 恒安全且常量时间
     if (
         not token
         or not x_internal_token
-        or not secrets.compare_digest(x_internal_token.encode("utf-8"), token.encode("utf-8"))
+        or not secrets.compare_digest(x_internal_token.encode("utf-8"), token)
     ):
         raise HTTPException(status_code=401, detail="无效的内部凭证")
 
@@ -52,7 +60,7 @@ async def check_approved(
     """该 QQ 是否有已过审提交 (主群加群申请自动准入判定)。"""
     submission = await SubmissionService.get_approved_by_qq(db, qq)
     # 最小披露: 只回布尔 (插件仅需此判定); 不回 player_name, 避免内部端点成为 QQ->真实玩家名 oracle
-    return ApiResponse(success=True, data={"approved": submission is not None})
+    return success_response(data={"approved": submission is not None})
 
 
 @router.get("/notifications", response_model=ApiResponse)
@@ -62,8 +70,7 @@ async def get_notifications(
 ):
     """取待发送的审核群通知 (插件轮询消费)。"""
     items = await bot_notify.list_pending(db, limit)
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "notifications": [
                 {
@@ -87,4 +94,4 @@ async def ack_notification(
 ):
     """标记通知已处理; submit 类型带 in_group 时回填 Submission.in_review_group。"""
     acked = await bot_notify.ack(db, notification_id, body.in_group)
-    return ApiResponse(success=True, data={"acked": acked})
+    return success_response(data={"acked": acked})
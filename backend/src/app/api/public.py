@@ -1,19 +1,25 @@
+import asyncio
+import logging
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Query
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
-from app.schemas import ApiResponse, SubmissionCreate, PublicSurveyResponse
+from app.schemas import ApiResponse, SubmissionCreate, PublicSurveyResponse, PublicQuestionResponse
 from app.services import SurveyService, SubmissionService, FileService, ActivityService
-from app.services import bot_notify
+from app.services import bot_notify, survey_cache
+from app.core.responses import success_response
 from app.services.mod_client import issue_registration_code as mod_issue_registration_code
 from app.core import (
     verify_turnstile,
+    remember_turnstile,
     check_ip_rate_limit,
     record_ip_submission,
     check_upload_rate_limit,
     record_ip_upload,
-    check_regcode_rate_limit,
-    record_regcode_attempt,
+    consume_regcode_rate_limit,
     check_query_rate_limit,
     check_submit_time,
     get_real_ip,
@@ -21,54 +27,70 @@ from app.core import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 router = APIRouter(prefix="/public", tags=["公开接口"])
 
+# 题目列表投影: 由 pydantic-core 批量读取 ORM 属性, 替代逐题手写 dict
+_PUBLIC_QUESTIONS = TypeAdapter(list[PublicQuestionResponse])
+
 
 @router.get("/security-config", response_model=ApiResponse)
 async def get_security_settings():
     """获取安全配置（供前端使用）"""
-    return ApiResponse(
-        success=True,
+    return success_response(
         data=get_security_config()
     )
 
 
 
+def _survey_snapshot(survey) -> dict:
+    """把问卷组装成可缓存的公开快照 (纯 dict)。题目按 order 排好, pinned 与之平行, 供每次请求随机抽题。"""
+    questions = survey.questions  # 关系已按 order 排序
+    return {
+        "code": survey.code,
+        "title": survey.title,
+        "description": survey.description,
+        "is_active": survey.is_active,
+        "is_random": survey.is_random,
+        "random_count": survey.random_count,
+        "questions": _PUBLIC_QUESTIONS.dump_python(
+            _PUBLIC_QUESTIONS.validate_python(questions, from_attributes=True)
+        ),
+        "pinned": [q.is_pinned for q in questions],
+    }
+
+
+def _public_survey_data(snapshot: dict) -> dict:
+    """由快照生成响应数据; 随机问卷每次请求重新抽题, 不缓存抽题结果。"""
+    questions = snapshot["questions"]
+    if snapshot["is_random"] and snapshot["random_count"]:
+        questions = SubmissionService.pick_questions(
+            questions, snapshot["pinned"], snapshot["random_count"]
+        )
+    return {
+        "code": snapshot["code"],
+        "title": snapshot["title"],
+        "description": snapshot["description"],
+        "questions": questions,
+    }
+
+
 @router.get("/survey/active", response_model=ApiResponse)
 async def get_active_survey(
     db: AsyncSession = Depends(get_db),
 ):
     """获取当前激活的问卷（公开，无需认证）"""
-    survey = await SurveyService.get_active_survey(db)
-    
-    if not survey:
+    async def _load():
+        survey = await SurveyService.get_active_survey(db)
+        return _survey_snapshot(survey) if survey else None
+
+    snapshot = await survey_cache.get_or_load(("active",), _load)
+    if not snapshot:
         raise HTTPException(status_code=404, detail="当前没有可用的问卷")
     
-    # 获取问题（可能是随机的）
-    questions = await SubmissionService.get_random_questions(survey)
-    
-    return ApiResponse(
-        success=True,
-        data={
-            "code": survey.code,
-            "title": survey.title,
-            "description": survey.description,
-            "questions": [
-                {
-                    "id": q.id,
-                    "title": q.title,
-                    "description": q.description,
-                    "type": q.type,
-                    "options": q.options,
-                    "is_required": q.is_required,
-                    "validation": q.validation,
-                    "condition": q.condition,
-                    "role": q.role,
-                }
-                for q in questions
-            ],
-        }
-    )
+    return success_response(data=_public_survey_data(snapshot))
 
 
 @router.get("/surveys/{code}", response_model=ApiResponse)
@@ -77,49 +99,27 @@ async def get_public_survey(
     db: AsyncSession = Depends(get_db),
 ):
     """获取问卷（公开，无需认证）"""
-    survey = await SurveyService.get_survey_by_code(db, code)
-    
-    if not survey:
+    async def _load():
+        survey = await SurveyService.get_survey_by_code(db, code)
+        return _survey_snapshot(survey) if survey else None
+
+    snapshot = await survey_cache.get_or_load(("code", code), _load)
+    if not snapshot:
         raise HTTPException(status_code=404, detail="问卷不存在")
     
-    if not survey.is_active:
+    if not snapshot["is_active"]:
         raise HTTPException(status_code=400, detail="问卷已关闭")
     
-    # 获取问题（可能是随机的）
-    questions = await SubmissionService.get_random_questions(survey)
-    
-    return ApiResponse(
-        success=True,
-        data={
-            "code": survey.code,
-            "title": survey.title,
-            "description": survey.description,
-            "questions": [
-                {
-                    "id": q.id,
-                    "title": q.title,
-                    "description": q.description,
-                    "type": q.type,
-                    "options": q.options,
-                    "is_required": q.is_required,
-                    "validation": q.validation,
-                    "condition": q.condition,
-                    "role": q.role,
-                }
-                for q in questions
-            ],
-        }
-    )
+    return success_response(data=_public_survey_data(snapshot))
 
 
-@router.post("/surveys/{code}/submit", response_model=ApiResponse)
-async def submit_survey(
-    code: str,
-    data: SubmissionCreate,
-    request: Request,
-    db: AsyncSession = Depends(get_db),
-):
-    """提交问卷（公开，无需认证）"""
+async def _prepare_submission(db: AsyncSession, code: str, data: SubmissionCreate, ip_address: Optional[str]):
+    """
+    提交前的本地校验: 查问卷、IP 限流、提交时间、答案合法性, 并按 role 抽取玩家名/QQ。
+
+    Returns:
+        (survey, fill_duration, player_name, qq)
+    """
     survey = await SurveyService.get_survey_by_code(db, code)
     
     if not survey:
@@ -128,42 +128,43 @@ async def submit_survey(
     if not survey.is_active:
         raise HTTPException(status_code=400, detail="问卷已关闭")
     
-    # 获取真实 IP 地址
-    ip_address = get_real_ip(request)
-    
-    # === 安全检查 ===
-    
-    # 1. Turnstile 验证
-    await verify_turnstile(data.turnstile_token, ip_address)
+    # === 安全检查 (Turnstile 由调用方并行验证) ===
     
-    # 2. IP 频率限制检查
+    # IP 频率限制检查
     await check_ip_rate_limit(ip_address, code)
     
-    # 3. 提交时间检测，同时获取填写耗时
+    # 提交时间检测，同时获取填写耗时
     fill_duration = check_submit_time(data.start_time)
     
     # === 业务逻辑验证 ===
     
-    # 添加调试日志
-    import logging
-    logger = logging.getLogger(__name__)
+    # 一次遍历题目: 题目 ID -> 题目 映射 (兼作合法 ID 集合)、必填题、按 role 标记的系统字段题
+    question_map = {}
+    required_ids = []
+    role_questions = []  # [(role, question_id), ...]
+    for q in survey.questions:
+        question_map[q.id] = q
+        if q.is_required:
+            required_ids.append(q.id)
+        if q.role:
+            role_questions.append((q.role, q.id))
+    answered_questions = {a.question_id for a in data.answers}
+    
     logger.info(f"[Submit] 玩家: {data.player_name}, 答案数: {len(data.answers)}")
-    logger.info(f"[Submit] 问卷问题 IDs: {[q.id for q in survey.questions]}")
+    logger.info(f"[Submit] 问卷问题 IDs: {list(question_map)}")
     logger.info(f"[Submit] 提交答案 IDs: {[a.question_id for a in data.answers]}")
     
-    # 验证答案
-    question_ids = {q.id for q in survey.questions}
-    for answer in data.answers:
-        if answer.question_id not in question_ids:
-            logger.warning(f"[Submit] 无效问题 ID: {answer.question_id}, 有效 IDs: {question_ids}")
-            raise HTTPException(
-                status_code=400, 
-                detail=f"无效的问题 ID: {answer.question_id}"
-            )
+    # 验证答案: 集合包含判断, 有非法 ID 时再按提交顺序找出第一个用于提示
+    if not answered_questions <= question_map.keys():
+        invalid_id = next(a.question_id for a in data.answers if a.question_id not in question_map)
+        logger.warning(f"[Submit] 无效问题 ID: {invalid_id}, 有效 IDs: {set(question_map)}")
+        raise HTTPException(
+            status_code=400, 
+            detail=f"无效的问题 ID: {invalid_id}"
+        )
     
     # 构建答案映射，用于检查条件题的依赖
     answer_map = {a.question_id: a.content for a in data.answers}
-    question_map = {q.id: q for q in survey.questions}
     
     # 预排序一次，供 is_question_visible 重复使用（避免每次调用都重新排序）
     sorted_questions = sorted(survey.questions, key=lambda q: q.id)
@@ -223,10 +224,9 @@ async def submit_survey(
     if not survey.is_random:
         # 只检查可见的必填题
         required_questions = {
-            q.id for q in survey.questions 
-            if q.is_required and is_question_visible(q)
+            qid for qid in required_ids
+            if is_question_visible(question_map[qid])
         }
-        answered_questions = {a.question_id for a in data.answers}
         missing = required_questions - answered_questions
         if missing:
             missing_titles = [question_map[qid].title for qid in missing if qid in question_map]
@@ -262,12 +262,11 @@ async def submit_survey(
 
     role_player_name = None
     role_qq = None
-    for q in survey.questions:
-        q_role = getattr(q, "role", None)
-        if q_role == "player_name" and q.id in answer_map:
-            role_player_name = _role_scalar(answer_map[q.id])
-        elif q_role == "qq" and q.id in answer_map:
-            role_qq = _role_scalar(answer_map[q.id])
+    for q_role, qid in role_questions:
+        if q_role == "player_name" and qid in answer_map:
+            role_player_name = _role_scalar(answer_map[qid])
+        elif q_role == "qq" and qid in answer_map:
+            role_qq = _role_scalar(answer_map[qid])
 
     # 玩家名优先用题目标记抽取, 兼容旧前端顶层 player_name; 缺失则拒绝 (白名单关联键不能空)
     effective_player_name = (role_player_name or data.player_name or "").strip()
@@ -281,6 +280,37 @@ async def submit_survey(
     if role_qq and (not role_qq.isdigit() or len(role_qq) > 15):
         raise HTTPException(status_code=400, detail="QQ号需为纯数字且长度合法")
 
+    return survey, fill_duration, effective_player_name, role_qq
+
+
+@router.post("/surveys/{code}/submit", response_model=ApiResponse)
+async def submit_survey(
+    code: str,
+    data: SubmissionCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
+    """提交问卷（公开，无需认证）"""
+    # 获取真实 IP 地址
+    ip_address = get_real_ip(request)
+    
+    # Turnstile 验证需往返 Cloudflare, 先行发出, 与查问卷/本地校验并行
+    turnstile_task = asyncio.create_task(verify_turnstile(data.turnstile_token, ip_address))
+    try:
+        survey, fill_duration, effective_player_name, role_qq = await _prepare_submission(
+            db, code, data, ip_address
+        )
+    except HTTPException:
+        # 本地校验失败时仍优先报告 Turnstile 失败, 与先验证再校验的报错顺序一致
+        await turnstile_task
+        # token 已验证但未用于提交: 放回缓存, 修正答案后可重试
+        remember_turnstile(data.turnstile_token, ip_address)
+        raise
+    except BaseException:
+        turnstile_task.cancel()
+        raise
+    await turnstile_task
+
     # 创建提交（包含填写耗时 + 按 role 抽取的玩家名/QQ）
     submission = await SubmissionService.create_submission(
         db, survey, data, ip_address, fill_duration,
@@ -288,7 +318,7 @@ async def submit_survey(
     )
 
     # 记录活动日志
-    await ActivityService.log_submit(db, effective_player_name, submission.id)
+    ActivityService.log_submit(effective_player_name, submission.id)
 
     # 入队审核群通知 (尽力而为: 入队失败不影响提交本身)
     try:
@@ -300,8 +330,7 @@ async def submit_survey(
     # 记录 IP 提交（用于频率限制）
     await record_ip_submission(ip_address, code)
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "id": submission.id,
             # 自助凭据: 玩家需妥善保存, 凭此查询进度并在通过后领取注册码
@@ -327,8 +356,7 @@ async def upload_file(
     # 记录上传
     await record_ip_upload(ip_address)
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "filename": uploaded.filename,
             "stored_name": uploaded.stored_name,
@@ -339,25 +367,27 @@ async def upload_file(
     )
 
 
+_STATUS_TEXT: dict[str, str] = {
+    "pending": "待审核",
+    "approved": "已通过",
+    "rejected": "未通过",
+}
+
+
 def _submission_status_dict(sub) -> dict:
     """把一条提交序列化为玩家可见的状态字典 (查询进度用)。明文码不在此出现。"""
-    status_text = {
-        "pending": "待审核",
-        "approved": "已通过",
-        "rejected": "未通过",
-    }.get(sub.status, "未知")
     code_issued = sub.code_issued_at is not None
     return {
         "id": sub.id,
         "token": sub.token,
         "player_name": sub.player_name,
         "status": sub.status,
-        "status_text": status_text,
+        "status_text": _STATUS_TEXT.get(sub.status, "未知"),
         # 时间线
         "timeline": {
-            "submitted_at": sub.created_at.isoformat() if sub.created_at else None,
-            "first_viewed_at": sub.first_viewed_at.isoformat() if sub.first_viewed_at else None,
-            "reviewed_at": sub.reviewed_at.isoformat() if sub.reviewed_at else None,
+            "submitted_at": sub.created_at,
+            "first_viewed_at": sub.first_viewed_at,
+            "reviewed_at": sub.reviewed_at,
         },
         # 填写耗时（格式化为分:秒）
         "fill_duration": _format_duration(sub.fill_duration) if sub.fill_duration else None,
@@ -390,8 +420,7 @@ async def query_submission_status(
     if not submission:
         raise HTTPException(status_code=404, detail="凭据无效或未找到对应的问卷提交")
 
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={"submission": _submission_status_dict(submission)},
     )
 
@@ -409,8 +438,7 @@ async def redeem_registration_code(
     每个提交仅放码一次; 未过审 / 已领取分别返回明确状态, 过期由玩家联系管理员补发。
     """
     ip_address = get_real_ip(request)
-    await check_regcode_rate_limit(ip_address)
-    await record_regcode_attempt(ip_address)
+    await consume_regcode_rate_limit(ip_address)
 
     submission = await SubmissionService.get_submission_by_token(db, token)
     if not submission:
@@ -424,8 +452,7 @@ async def redeem_registration_code(
         raise HTTPException(status_code=409, detail="问卷尚未通过审核, 暂不能领取注册码")
 
     if status == "already_issued":
-        return ApiResponse(
-            success=True,
+        return success_response(
             data={
                 "already_issued": True,
                 "message": "该问卷的注册码已领取过。如遗失或已过期, 请联系管理员补发。",
@@ -433,8 +460,7 @@ async def redeem_registration_code(
         )
 
     # status == "ok": 明文码仅在此响应出现, 严禁写日志
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "registration_code": code_data["registration_code"],
             "code_expires_minutes": code_data.get("code_expires_minutes"),
@@ -445,12 +471,10 @@ async def redeem_registration_code(
 
 def _format_duration(seconds: float) -> str:
     """格式化填写耗时"""
-    if seconds < 60:
-        return f"{int(seconds)}秒"
-    minutes = int(seconds // 60)
-    secs = int(seconds % 60)
-    if minutes < 60:
+    minutes, secs = divmod(int(seconds), 60)
+    if not minutes:
+        return f"{secs}秒"
+    hours, mins = divmod(minutes, 60)
+    if not hours:
         return f"{minutes}分{secs}秒"
-    hours = int(minutes // 60)
-    mins = int(minutes % 60)
     return f"{hours}小时{mins}分"
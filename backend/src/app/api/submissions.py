@@ -1,12 +1,16 @@
 import logging
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import orjson
+from datetime import datetime, timezone
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.db import get_db, uses_sqlite
 from app.core import get_current_user, CurrentUser
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.responses import success_response
 from app.schemas import ApiResponse, SubmissionReview
-from app.services import SubmissionService, SurveyService, CleanupService, ActivityService
+from app.services import SubmissionService, CleanupService, ActivityService
 from app.services import bot_notify
 from app.services.ip_location import lookup as resolve_ip_location
 from app.models import Question
@@ -37,8 +41,7 @@ async def run_cleanup(
     else:
         freed_str = f"{bytes_freed} bytes"
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "submissions_cleaned": stats["submissions_cleaned"],
             "images_cleared": stats["images_cleared"],
@@ -56,12 +59,12 @@ async def get_stats(
     user: CurrentUser = Depends(get_current_user),
 ):
     """获取统计概览"""
-    _, pending_count = await SubmissionService.get_submissions(db, 1, 1, "pending")
-    _, approved_count = await SubmissionService.get_submissions(db, 1, 1, "approved")
-    _, rejected_count = await SubmissionService.get_submissions(db, 1, 1, "rejected")
+    counts = await SubmissionService.get_status_counts(db)
+    pending_count = counts.get("pending", 0)
+    approved_count = counts.get("approved", 0)
+    rejected_count = counts.get("rejected", 0)
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "pending": pending_count,
             "approved": approved_count,
@@ -75,6 +78,7 @@ async def get_stats(
 async def get_submissions(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="游标分页: 上一页返回的 next_cursor, 传入时忽略 page"),
     status: Optional[str] = Query(None, pattern="^(pending|approved|rejected)$"),
     survey_id: Optional[int] = None,
     player_name: Optional[str] = None,
@@ -82,50 +86,79 @@ async def get_submissions(
     user: CurrentUser = Depends(get_current_user),
 ):
     """获取提交列表（审核列表）"""
-    submissions, total = await SubmissionService.get_submissions(
-        db, page, size, status, survey_id, player_name
-    )
+    after = decode_cursor(cursor) if cursor else None
+    # 游标分页不计总数: 多取一行探测是否还有下一页 (page 在游标模式下不参与计算)
+    limit = size + 1 if after is not None else size
+    sqlite = uses_sqlite(db)
+    if sqlite:
+        # SQLite 直接产出每行 JSON, 原样嵌入响应
+        rows, total = await SubmissionService.get_submissions_json(
+            db, page, limit, status, survey_id, player_name, after=after
+        )
+    else:
+        # 每行已是列表字段 dict; in_review_group 为 True/False/null, 面板标记"未在审核群"
+        rows, total = await SubmissionService.get_submissions(
+            db, page, limit, status, survey_id, player_name, after=after
+        )
+    has_more = len(rows) > size if total is None else page * size < total
+    rows = rows[:size]
     
-    items = []
-    for sub in submissions:
-        items.append({
-            "id": sub.id,
-            "survey_id": sub.survey_id,
-            "survey_title": sub.survey.title if sub.survey else "",
-            "player_name": sub.player_name,
-            "qq": sub.qq,
-            "status": sub.status,
-            "in_review_group": sub.in_review_group,  # True/False/null, 面板标记"未在审核群"
-            "created_at": sub.created_at.isoformat(),
-            "reviewed_at": sub.reviewed_at.isoformat() if sub.reviewed_at else None,
-        })
+    if sqlite:
+        items = [orjson.Fragment(row) for row in rows]
+        last = orjson.loads(rows[-1]) if rows else None
+    else:
+        items = rows
+        last = rows[-1] if rows else None
     
-    return ApiResponse(
-        success=True,
-        data={
+    next_cursor = None
+    if last is not None and has_more:
+        created_at = last["created_at"]
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        next_cursor = encode_cursor(created_at, last["id"])
+    
+    if total is None:
+        return success_response(data={
             "items": items,
-            "page": page,
             "size": size,
-            "total": total,
-            "pages": (total + size - 1) // size,
-        }
-    )
+            "has_more": has_more,
+            "next_cursor": next_cursor,
+        })
+    
+    return success_response(data={
+        "items": items,
+        "page": page,
+        "size": size,
+        "total": total,
+        "pages": (total + size - 1) // size,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+    })
 
 
 @router.get("/{submission_id}", response_model=ApiResponse)
 async def get_submission(
     submission_id: int,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ):
     """获取提交详情"""
-    # 获取提交并标记首次查看时间
-    submission = await SubmissionService.get_submission_by_id(db, submission_id, mark_viewed=True)
+    # 问卷及其问题随提交一并预加载, 无需再单独查一次问卷
+    submission = await SubmissionService.get_submission_by_id(
+        db, submission_id, load_questions=True
+    )
     if not submission:
         raise HTTPException(status_code=404, detail="提交不存在")
     
-    # 获取问卷以获取问题信息
-    survey = await SurveyService.get_survey_by_id(db, submission.survey_id)
+    # 首次查看时间在响应发出后再落库, 不占用本次请求; 响应直接带上将写入的时间
+    # (去掉时区, 与库中读回的 naive UTC 时间格式一致)
+    first_viewed_at = submission.first_viewed_at
+    if first_viewed_at is None:
+        first_viewed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        background_tasks.add_task(SubmissionService.mark_viewed, submission_id, first_viewed_at)
+    
+    survey = submission.survey
     questions_map = {q.id: q for q in survey.questions} if survey else {}
     
     answers = []
@@ -141,8 +174,7 @@ async def get_submission(
             "content": answer.content,
         })
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "id": submission.id,
             "survey_id": submission.survey_id,
@@ -152,12 +184,12 @@ async def get_submission(
             "ip_address": submission.ip_address,
             "ip_location": resolve_ip_location(submission.ip_address),  # 离线 ip2region 解析, 无数据则 null
             "fill_duration": submission.fill_duration,  # 填写耗时
-            "first_viewed_at": submission.first_viewed_at.isoformat() if submission.first_viewed_at else None,  # 首次查看时间
+            "first_viewed_at": first_viewed_at,  # 首次查看时间
             "status": submission.status,
             "review_note": submission.review_note,
             "answers": answers,
-            "created_at": submission.created_at.isoformat(),
-            "reviewed_at": submission.reviewed_at.isoformat() if submission.reviewed_at else None,
+            "created_at": submission.created_at,
+            "reviewed_at": submission.reviewed_at,
             "reviewed_by": submission.reviewed_by,
         }
     )
@@ -182,8 +214,7 @@ async def review_submission(
     submission = await SubmissionService.review_submission(db, submission, data, user.id)
 
     # 记录活动日志
-    await ActivityService.log_review(
-        db,
+    ActivityService.log_review(
         player_name=player_name,
         submission_id=submission_id,
         status=data.status,
@@ -201,8 +232,7 @@ async def review_submission(
         await db.rollback()  # 清掉入队失败的脏会话 (尽力而为, 不影响审核结果)
         logger.warning("入队审核通知失败 (不影响审核)", exc_info=True)
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "id": submission.id,
             "status": submission.status,
@@ -1,23 +1,27 @@
+import hashlib
+import logging
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import get_db
 from app.core import get_current_user, CurrentUser
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.responses import success_response
 from app.models import Survey
 from app.schemas import (
     ApiResponse,
     SurveyCreate,
     SurveyUpdate,
-    SurveyResponse,
-    SurveyDetailResponse,
     QuestionCreate,
     QuestionUpdate,
-    QuestionResponse,
 )
 from app.services import SurveyService, QuestionService
 
 
+logger = logging.getLogger(__name__)
+
+
 router = APIRouter(prefix="/surveys", tags=["问卷管理"])
 
 
@@ -28,8 +32,7 @@ async def get_survey_stats(
 ):
     """获取问卷统计概览"""
     stats = await SurveyService.get_survey_stats(db)
-    return ApiResponse(
-        success=True,
+    return success_response(
         data=stats
     )
 
@@ -42,8 +45,7 @@ async def create_survey(
 ):
     """创建问卷"""
     survey = await SurveyService.create_survey(db, data, user.id)
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "id": survey.id,
             "code": survey.code,
@@ -56,47 +58,67 @@ async def create_survey(
 async def get_surveys(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="游标分页: 上一页返回的 next_cursor, 传入时忽略 page"),
     search: Optional[str] = None,
     is_active: Optional[bool] = None,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ):
     """获取问卷列表"""
-    surveys, total = await SurveyService.get_surveys(db, page, size, search, is_active)
+    if cursor:
+        # 游标分页不计总数: 多取一行探测是否还有下一页
+        surveys = await SurveyService.get_surveys_after(
+            db, decode_cursor(cursor), size + 1, search, is_active
+        )
+        has_more = len(surveys) > size
+        surveys = surveys[:size]
+        total = None
+    else:
+        surveys, total = await SurveyService.get_surveys(db, page, size, search, is_active)
+        has_more = page * size < total
     
-    items = []
-    for survey in surveys:
-        question_count = await SurveyService.get_question_count(db, survey.id)
-        submission_count = await SurveyService.get_submission_count(db, survey.id)
-        items.append({
-            "id": survey.id,
-            "title": survey.title,
-            "description": survey.description,
-            "code": survey.code,
-            "is_active": survey.is_active,
-            "is_random": survey.is_random,
-            "random_count": survey.random_count,
-            "question_count": question_count,
-            "submission_count": submission_count,
-            "created_at": survey.created_at.isoformat(),
-            "updated_at": survey.updated_at.isoformat(),
-        })
-    
-    return ApiResponse(
-        success=True,
+    # 每行已是列表字段 (含问题数/提交数) 的投影
+    items = [row._asdict() for row in surveys]
+    
+    next_cursor = (
+        encode_cursor(surveys[-1].created_at, surveys[-1].id) if has_more and surveys else None
+    )
+    
+    if total is None:
+        return success_response(
+            data={
+                "items": items,
+                "size": size,
+                "has_more": has_more,
+                "next_cursor": next_cursor,
+            }
+        )
+    
+    return success_response(
         data={
             "items": items,
             "page": page,
             "size": size,
             "total": total,
             "pages": (total + size - 1) // size,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
         }
     )
 
 
+def _survey_etag(survey: Survey) -> str:
+    """问卷详情的 ETag: 问卷及其题目的任何变更都会刷新 updated_at"""
+    digest = hashlib.blake2b(
+        f"{survey.id}:{survey.updated_at.isoformat()}".encode(), digest_size=8
+    ).hexdigest()
+    return f'"{digest}"'
+
+
 @router.get("/{survey_id}", response_model=ApiResponse)
 async def get_survey(
     survey_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: CurrentUser = Depends(get_current_user),
 ):
@@ -105,10 +127,15 @@ async def get_survey(
     if not survey:
         raise HTTPException(status_code=404, detail="问卷不存在")
     
-    questions = sorted(survey.questions, key=lambda q: q.order)
+    # 未变更则回 304, 跳过整份题目列表的序列化与传输
+    etag = _survey_etag(survey)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in {t.strip() for t in if_none_match.split(",")}:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    questions = survey.questions  # 关系已按 order 排序
     
-    return ApiResponse(
-        success=True,
+    response = success_response(
         data={
             "id": survey.id,
             "title": survey.title,
@@ -132,10 +159,12 @@ async def get_survey(
                 }
                 for q in questions
             ],
-            "created_at": survey.created_at.isoformat(),
-            "updated_at": survey.updated_at.isoformat(),
+            "created_at": survey.created_at,
+            "updated_at": survey.updated_at,
         }
     )
+    response.headers["ETag"] = etag
+    return response
 
 
 @router.patch("/{survey_id}", response_model=ApiResponse)
@@ -146,15 +175,11 @@ async def update_survey(
     user: CurrentUser = Depends(get_current_user),
 ):
     """更新问卷"""
-    survey = await SurveyService.get_survey_by_id(db, survey_id)
-    if not survey:
+    if not await SurveyService.update_survey(db, survey_id, data):
         raise HTTPException(status_code=404, detail="问卷不存在")
     
-    survey = await SurveyService.update_survey(db, survey, data)
-    
-    return ApiResponse(
-        success=True,
-        data={"id": survey.id, "message": "更新成功"}
+    return success_response(
+        data={"id": survey_id, "message": "更新成功"}
     )
 
 
@@ -165,14 +190,10 @@ async def delete_survey(
     user: CurrentUser = Depends(get_current_user),
 ):
     """删除问卷"""
-    survey = await SurveyService.get_survey_by_id(db, survey_id)
-    if not survey:
+    if not await SurveyService.delete_survey(db, survey_id):
         raise HTTPException(status_code=404, detail="问卷不存在")
     
-    await SurveyService.delete_survey(db, survey)
-    
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={"message": "删除成功"}
     )
 
@@ -187,8 +208,8 @@ async def add_question(
     user: CurrentUser = Depends(get_current_user),
 ):
     """添加问题"""
-    # DEBUG: 打印接收到的数据
-    print(f"[DEBUG] add_question received: is_pinned={data.is_pinned}, data={data.model_dump()}")
+    # 调试日志: 仅 DEBUG 级别输出, 默认不格式化
+    logger.debug("add_question received: is_pinned=%s", data.is_pinned)
     
     survey = await SurveyService.get_survey_by_id(db, survey_id)
     if not survey:
@@ -196,8 +217,7 @@ async def add_question(
     
     question = await QuestionService.add_question(db, survey_id, data)
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={
             "id": question.id,
             "title": question.title,
@@ -221,8 +241,7 @@ async def update_question(
     
     question = await QuestionService.update_question(db, question, data)
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={"id": question.id, "message": "更新成功"}
     )
 
@@ -241,7 +260,6 @@ async def delete_question(
     
     await QuestionService.delete_question(db, question)
     
-    return ApiResponse(
-        success=True,
+    return success_response(
         data={"message": "删除成功"}
     )
@@ -1,8 +1,11 @@
-from app.core.config import get_settings, Settings
+from app.core.config import get_settings, get_hot_config, Settings, HotConfig
 from app.core.jwt import JwtUtil, TokenPayload
 from app.core.deps import get_current_user, get_optional_user, CurrentUser
 from app.core.security import (
     verify_turnstile,
+    remember_turnstile,
+    close_http_client,
+    get_http_client,
     check_submit_time,
     get_real_ip,
     get_security_config,
@@ -12,26 +15,29 @@ from app.core.rate_limit import (
     record_ip_submission,
     check_upload_rate_limit,
     record_ip_upload,
-    check_regcode_rate_limit,
-    record_regcode_attempt,
+    consume_regcode_rate_limit,
     check_query_rate_limit,
 )
 
 __all__ = [
     "get_settings",
+    "get_hot_config",
     "Settings",
+    "HotConfig",
     "JwtUtil",
     "TokenPayload",
     "get_current_user",
     "get_optional_user",
     "CurrentUser",
     "verify_turnstile",
+    "remember_turnstile",
+    "close_http_client",
+    "get_http_client",
     "check_ip_rate_limit",
     "record_ip_submission",
     "check_upload_rate_limit",
     "record_ip_upload",
-    "check_regcode_rate_limit",
-    "record_regcode_attempt",
+    "consume_regcode_rate_limit",
     "check_query_rate_limit",
     "check_submit_time",
     "get_real_ip",
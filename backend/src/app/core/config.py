@@ -1,9 +1,16 @@
+from dataclasses import dataclass
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from functools import lru_cache
+from functools import cached_property, lru_cache
 import yaml
 from pathlib import Path
 
+# 优先使用 libyaml 的 C 解析器, 未编译 libyaml 时回退纯 Python 实现
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 
 class ServerSettings(BaseSettings):
     host: str = "0.0.0.0"
@@ -13,6 +20,9 @@ class ServerSettings(BaseSettings):
 
 class DatabaseSettings(BaseSettings):
     url: str = "sqlite+aiosqlite:///./data/survey.db"
+    # 连接池: 常驻连接数 / 突发时额外允许的连接数 (SQLite 写串行, 池主要服务 WAL 下的并发读)
+    pool_size: int = 8
+    max_overflow: int = 16
 
 
 class AuthSettings(BaseSettings):
@@ -44,6 +54,11 @@ class UploadSettings(BaseSettings):
     def max_size_bytes(self) -> int:
         return self.max_size_mb * 1024 * 1024
 
+    @cached_property
+    def allowed_type_set(self) -> frozenset[str]:
+        """allowed_types 的集合形式, 供上传时 O(1) 判断 MIME 类型"""
+        return frozenset(self.allowed_types)
+
 
 class CorsSettings(BaseSettings):
     allowed_origins: list[str] = ["*"]
@@ -100,7 +115,7 @@ def load_config() -> Settings:
     
     if config_path.exists():
         with open(config_path, "r", encoding="utf-8") as f:
-            config_data = yaml.safe_load(f)
+            config_data = yaml.load(f, Loader=_YamlLoader)
         
         # 解析 security 配置
         security_data = config_data.get("security", {})
@@ -128,3 +143,32 @@ def load_config() -> Settings:
 @lru_cache
 def get_settings() -> Settings:
     return load_config()
+
+
+@dataclass(frozen=True, slots=True)
+class HotConfig:
+    """提交/上传/限流热路径读取的扁平配置快照
+
+    由 Settings 派生, 读取时免去 settings.security.xxx.yyy 的多级属性查找。
+    """
+    rate_limit_enabled: bool
+    max_submissions_per_day: int
+    turnstile_enabled: bool
+    turnstile_secret_key: str
+    time_check_enabled: bool
+    min_submit_time: int
+    debug: bool
+
+
+@lru_cache
+def get_hot_config() -> HotConfig:
+    security = get_settings().security
+    return HotConfig(
+        rate_limit_enabled=security.rate_limit.enabled,
+        max_submissions_per_day=security.rate_limit.max_submissions_per_day,
+        turnstile_enabled=security.turnstile.enabled,
+        turnstile_secret_key=security.turnstile.secret_key,
+        time_check_enabled=security.time_check.enabled,
+        min_submit_time=security.time_check.min_submit_time,
+        debug=get_settings().server.debug,
+    )
@@ -1,16 +1,27 @@
 import hashlib
 import hmac
 import base64
-import json
-from datetime import datetime
+import re
+import time
+from functools import lru_cache
 from typing import Optional
-from pydantic import BaseModel
+import orjson
+from pydantic import BaseModel, ConfigDict
 
 from app.core.config import get_settings
 
 
+# 已验签 token 的缓存容量: 同一管理员的 token 在有效期内反复出现, 命中即免去验签与解析
+VERIFY_CACHE_SIZE = 4096
+
+# header.payload.signature, 各段均为无 padding 的 base64url
+_TOKEN_RE = re.compile(r"([A-Za-z0-9_-]+)\.([A-Za-z0-9_-]+)\.([A-Za-z0-9_-]+)")
+
+
 class TokenPayload(BaseModel):
-    """JWT Token 载荷"""
+    """JWT Token 载荷 (不可变: 验签结果按 token 缓存, 多个请求共享同一实例)"""
+    model_config = ConfigDict(frozen=True)
+
     sub: str  # username
     adminId: int
     iat: int
@@ -30,13 +41,13 @@ class JwtUtil:
         return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
     
     @staticmethod
-    def _base64url_decode(data: str) -> str:
-        """Base64 URL 解码"""
+    def _base64url_decode(data: str) -> bytes:
+        """Base64 URL 解码 (返回字节, 直接交给 orjson 解析)"""
         # 补齐 padding
         padding = 4 - len(data) % 4
         if padding != 4:
             data += "=" * padding
-        return base64.urlsafe_b64decode(data).decode()
+        return base64.urlsafe_b64decode(data)
     
     @classmethod
     def _create_signature(cls, data: str) -> str:
@@ -45,48 +56,31 @@ class JwtUtil:
         与 mod 端 JwtUtil 对齐: signature = urlsafe_base64(HmacSHA256(data, secretBytes))
         secretBytes 为 jwt_secret 字符串的 UTF-8 字节, base64url 无 padding。
         """
-        settings = get_settings()
-        secret = settings.auth.jwt_secret.encode("utf-8")
-        digest = hmac.new(secret, data.encode("utf-8"), hashlib.sha256).digest()
-        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+        digest = hmac.new(_secret_bytes(), data.encode("utf-8"), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
     
     @classmethod
     def verify_and_decode(cls, token: str) -> Optional[TokenPayload]:
         """
         验证并解析 JWT Token
         
+        验签与解析结果按 token 缓存 (见 _verify_signed); 过期时间每次重新判断,
+        缓存中的 token 过期后同样返回 None。
+        
         Args:
             token: JWT Token 字符串
             
         Returns:
             解析后的 payload，验证失败返回 None
         """
-        try:
-            parts = token.split(".")
-            if len(parts) != 3:
-                return None
-            
-            encoded_header, encoded_payload, signature = parts
-            
-            # 验证签名
-            data = f"{encoded_header}.{encoded_payload}"
-            expected_signature = cls._create_signature(data)
-            
-            if signature != expected_signature:
-                return None
-            
-            # 解析 payload
-            payload_json = cls._base64url_decode(encoded_payload)
-            payload_dict = json.loads(payload_json)
-            
-            # 检查过期时间
-            if datetime.now().timestamp() > payload_dict["exp"]:
-                return None
-            
-            return TokenPayload(**payload_dict)
-            
-        except Exception:
+        # 结构不合法的 token 直接拒绝, 不进验签缓存 (免得垃圾 token 挤掉有效条目)
+        if not _TOKEN_RE.fullmatch(token):
             return None
+        payload = _verify_signed(token)
+        # 检查过期时间
+        if payload is None or time.time() > payload.exp:
+            return None
+        return payload
     
     @classmethod
     def get_admin_id(cls, token: str) -> Optional[int]:
@@ -105,3 +99,33 @@ class JwtUtil:
         """检查 Token 是否过期"""
         payload = cls.verify_and_decode(token)
         return payload is None
+
+
+@lru_cache(maxsize=1)
+def _secret_bytes() -> bytes:
+    """jwt_secret 的 UTF-8 字节 (配置进程内不变, 只编码一次)"""
+    return get_settings().auth.jwt_secret.encode("utf-8")
+
+
+@lru_cache(maxsize=VERIFY_CACHE_SIZE)
+def _verify_signed(token: str) -> Optional[TokenPayload]:
+    """验签并解析 payload, 不判断过期; 结果只取决于 token 本身, 可按 token 缓存
+    
+    调用方已用 _TOKEN_RE 校验过结构。
+    """
+    try:
+        encoded_header, encoded_payload, signature = token.split(".")
+        
+        # 验证签名
+        data = f"{encoded_header}.{encoded_payload}"
+        expected_signature = JwtUtil._create_signature(data)
+        
+        # 常量时间比较
+        if not hmac.compare_digest(signature, expected_signature):
+            return None
+        
+        # 解析 payload
+        return TokenPayload(**orjson.loads(JwtUtil._base64url_decode(encoded_payload)))
+        
+    except Exception:
+        return None
@@ -0,0 +1,27 @@
+"""
+列表游标分页 (keyset) 的游标编解码
+
+游标是最后一行的 (created_at, id), 编码为不透明的 base64url 串; 下一页按
+(created_at, id) < 游标 取数, 走索引直接定位, 页再深也不必 OFFSET 扫描丢弃前面的行。
+"""
+import base64
+from datetime import datetime
+
+import orjson
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """(created_at, id) 编码为不透明的 base64url 串"""
+    raw = orjson.dumps([created_at, row_id])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """解码游标; 格式不对时 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = orjson.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="无效的分页游标")
@@ -1,19 +1,39 @@
 """
-IP 限流模块 - 使用本地 JSON 文件存储
+IP 限流模块 - 内存 deque + SQLite 持久化
+
+每个 IP 的事件时间戳保存在内存 deque 中, 限流判断只读内存; 事件先进待写缓冲, 由后台任务
+每 5 秒批量写入独立的 data/rate_limit.db (WAL 模式), 每分钟删除超过 24 小时的记录。
+启动时从库中载入最近 24 小时的事件, 进程重启不丢当日计数。
+
+各检查/记录函数内部没有 await, 在单线程事件循环中天然原子, 不需要加锁。
 """
-import json
 import asyncio
-import aiofiles
+import contextlib
+import logging
+import time
+from collections import deque
 from pathlib import Path
 from typing import Optional
-from datetime import datetime, timezone
+
+import aiosqlite
 from fastapi import HTTPException
 
-from app.core.config import get_settings
+from app.core.config import get_hot_config
+
+logger = logging.getLogger(__name__)
 
 
-# JSON 文件路径
-RATE_LIMIT_FILE = Path("data/rate_limit.json")
+# 限流事件库路径 (与业务库分开, 避免与业务写入争用写锁)
+RATE_LIMIT_DB = Path("data/rate_limit.db")
+
+# 待写事件落盘间隔 / 过期记录清理间隔（秒）: 进程崩溃最多丢失最近 FLUSH_INTERVAL 秒的计数
+FLUSH_INTERVAL = 5
+PRUNE_INTERVAL = 60
+# 事件库持续不可写时待写缓冲最多积压的条数, 落盘失败放回的事件超出部分丢弃 (内存计数不受影响)
+MAX_PENDING = 10_000
+
+# 计数窗口（秒）
+WINDOW_SECONDS = 86400
 
 # 领码端点每 IP 每日上限: token 不可枚举, 此限流主要防滥用/DoS, 取较宽松值容忍同一浏览器多份提交的合法重试。
 MAX_REGCODE_ATTEMPTS_PER_DAY = 30
@@ -22,276 +42,323 @@ MAX_REGCODE_ATTEMPTS_PER_DAY = 30
 # 每个 token 各查一次, 故按分钟给较宽松额度。
 MAX_QUERY_PER_MINUTE = 30
 
-# 内存缓存
-_cache: dict = {
-    "submissions": {},  # {ip: [(timestamp, survey_code), ...]}
-    "uploads": {},      # {ip: [timestamp, ...]}
-    "regcodes": {},     # {ip: [timestamp, ...]}
+# 每次提交最多上传的图片数, 上传日上限 = 每日最大提交次数 * 此值
+UPLOADS_PER_SUBMISSION = 5
+
+# 内存缓存: 每个 IP 一个按时间递增的时间戳 deque, 长度以当日上限为界 (是否超限只看最近 N 条)
+_cache: dict[str, dict[str, deque]] = {
+    "submissions": {},  # {ip: deque([timestamp, ...])}
+    "uploads": {},      # {ip: deque([timestamp, ...])}
+    "regcodes": {},     # {ip: deque([timestamp, ...])}
 }
+# 提交对应的问卷代码, 与 _cache["submissions"] 按下标一一对应 (同 maxlen, 一起进出)
+_submission_codes: dict[str, deque] = {}
 
 # 查询端点的 per-IP per-minute 时间戳, 纯内存不落盘 (突发防护无需持久化, 与上面持久化的 _cache 分开)
 _query_hits: dict = {}
-_cache_dirty = False
-_lock = asyncio.Lock()
-
+_db: Optional[aiosqlite.Connection] = None
+_pending: list[tuple] = []  # 尚未落盘的事件 (kind, ip, ts, code)
+_persist_task: Optional[asyncio.Task] = None
 
-async def _load_from_file() -> None:
-    """从 JSON 文件加载数据到内存"""
-    global _cache
-    
-    if not RATE_LIMIT_FILE.exists():
-        return
-    
-    try:
-        async with aiofiles.open(RATE_LIMIT_FILE, "r", encoding="utf-8") as f:
-            content = await f.read()
-            if content.strip():
-                _cache = json.loads(content)
-    except (json.JSONDecodeError, IOError):
-        # 文件损坏或读取失败，使用空缓存
-        _cache = {"submissions": {}, "uploads": {}}
-
-
-async def _save_to_file() -> None:
-    """保存内存数据到 JSON 文件"""
-    global _cache_dirty
-    
-    # 确保目录存在
-    RATE_LIMIT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    
-    async with aiofiles.open(RATE_LIMIT_FILE, "w", encoding="utf-8") as f:
-        await f.write(json.dumps(_cache, ensure_ascii=False, indent=2))
-    
-    _cache_dirty = False
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS rate_limit_events (
+        kind TEXT NOT NULL,
+        ip TEXT NOT NULL,
+        ts REAL NOT NULL,
+        code TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_rate_limit_events_ts ON rate_limit_events (ts)",
+)
+
+
+def _maxlen(kind: str) -> int:
+    """各类事件在内存中需保留的条数 (即当日上限)"""
+    max_submissions = get_hot_config().max_submissions_per_day
+    if kind == "submissions":
+        return max_submissions
+    if kind == "uploads":
+        return max_submissions * UPLOADS_PER_SUBMISSION
+    return MAX_REGCODE_ATTEMPTS_PER_DAY
+
+
+def _records(kind: str, ip: str) -> deque:
+    """取某 IP 的事件 deque, 不存在则新建"""
+    bucket = _cache[kind]
+    records = bucket.get(ip)
+    if records is None:
+        records = bucket[ip] = deque(maxlen=_maxlen(kind))
+    return records
+
+
+def _submission_codes_for(ip: str) -> deque:
+    """取某 IP 的提交问卷代码 deque, 不存在则新建"""
+    codes = _submission_codes.get(ip)
+    if codes is None:
+        codes = _submission_codes[ip] = deque(maxlen=_maxlen("submissions"))
+    return codes
+
+
+def _evict(records: deque, cutoff_time: float) -> None:
+    """弹出过期记录: 记录按时间递增, 只需从队头弹"""
+    while records and records[0] <= cutoff_time:
+        records.popleft()
+
+
+def _evict_submissions(ip: str, cutoff_time: float) -> deque:
+    """弹出该 IP 过期的提交记录, 问卷代码同步对齐; 返回时间戳 deque"""
+    records = _records("submissions", ip)
+    _evict(records, cutoff_time)
+    codes = _submission_codes_for(ip)
+    while len(codes) > len(records):
+        codes.popleft()
+    return records
+
+
+def _add(kind: str, ip: str, ts: float, code: Optional[str] = None) -> None:
+    """事件入内存 deque"""
+    if kind == "submissions":
+        _records(kind, ip).append(ts)
+        _submission_codes_for(ip).append(code)
+    else:
+        _records(kind, ip).append(ts)
 
 
-async def _ensure_loaded() -> None:
-    """确保数据已加载"""
-    if not _cache.get("_loaded"):
-        await _load_from_file()
-        _cache["_loaded"] = True
+async def load() -> None:
+    """打开限流事件库并载入最近 24 小时的事件 (应用启动时调用一次)"""
+    global _db
+    if _db is not None:
+        return
 
+    # 确保目录存在
+    RATE_LIMIT_DB.parent.mkdir(parents=True, exist_ok=True)
+    db = await aiosqlite.connect(RATE_LIMIT_DB)
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    for statement in _SCHEMA:
+        await db.execute(statement)
+    await db.commit()
+
+    async with db.execute(
+        "SELECT kind, ip, ts, code FROM rate_limit_events WHERE ts > ? ORDER BY ts",
+        (time.time() - WINDOW_SECONDS,),
+    ) as cursor:
+        async for kind, ip, ts, code in cursor:
+            if kind in _cache:
+                _add(kind, ip, ts, code)
+    _db = db
+
+
+def _append(kind: str, ip: str, now: float, code: Optional[str] = None) -> None:
+    """记录一次事件: 入内存 deque, 并进待写缓冲由后台任务批量落盘 (请求路径不做 I/O)"""
+    _add(kind, ip, now, code)
+    if _db is not None:  # 未载入事件库 (如未经 lifespan 启动) 时只计内存
+        _pending.append((kind, ip, now, code))
+
+
+async def flush() -> None:
+    """把待写事件批量写入限流事件库 (一次事务); 失败或被取消时放回缓冲等下次重试"""
+    global _pending
+    if not _pending or _db is None:
+        return
+    rows, _pending = _pending, []
+    try:
+        await _db.executemany(
+            "INSERT INTO rate_limit_events (kind, ip, ts, code) VALUES (?, ?, ?, ?)", rows
+        )
+        await _db.commit()
+    except BaseException:
+        _pending[:0] = rows[: max(MAX_PENDING - len(_pending), 0)]
+        raise
 
-async def _save_if_dirty() -> None:
-    """如果数据有变化则保存"""
-    global _cache_dirty
-    if _cache_dirty:
-        await _save_to_file()
 
+async def prune() -> None:
+    """删除库中过期记录, 并清掉内存中已无有效记录的 IP"""
+    if _db is None:
+        return
 
-def _clean_old_records(records: list, cutoff_time: float) -> list:
-    """清理过期记录"""
-    if isinstance(records[0] if records else None, list):
-        # submissions 格式: [[timestamp, survey_code], ...]
-        return [r for r in records if r[0] > cutoff_time]
-    else:
-        # uploads 格式: [timestamp, ...]
-        return [r for r in records if r > cutoff_time]
+    cutoff = time.time() - WINDOW_SECONDS
+    for ip in list(_cache["submissions"]):
+        if not _evict_submissions(ip, cutoff):
+            del _cache["submissions"][ip]
+            del _submission_codes[ip]
+    for kind in ("uploads", "regcodes"):
+        bucket = _cache[kind]
+        for ip in list(bucket):
+            _evict(bucket[ip], cutoff)
+            if not bucket[ip]:
+                del bucket[ip]
+
+    await _db.execute("DELETE FROM rate_limit_events WHERE ts <= ?", (cutoff,))
+    await _db.commit()
+
+
+async def _persist_loop() -> None:
+    """后台持久化循环: 每 FLUSH_INTERVAL 秒落盘待写事件, 每 PRUNE_INTERVAL 秒清理过期记录"""
+    elapsed = 0
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        elapsed += FLUSH_INTERVAL
+        try:
+            await flush()
+            if elapsed >= PRUNE_INTERVAL:
+                elapsed = 0
+                await prune()
+        except Exception:
+            logger.warning("限流数据落盘失败", exc_info=True)
+
+
+def start_persist_task() -> None:
+    """启动后台持久化任务"""
+    global _persist_task
+    if _persist_task is None or _persist_task.done():
+        _persist_task = asyncio.create_task(_persist_loop())
+
+
+async def stop_persist_task() -> None:
+    """停止后台任务, 落盘剩余事件并关闭事件库"""
+    global _persist_task, _db
+    task, _persist_task = _persist_task, None
+    if task is not None:
+        # 等任务真正退出再做最后一次落盘: 若正停在 flush/prune 的 await 上, 免得与之并发写库或在其后关库
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    await flush()
+    if _db is not None:
+        await _db.close()
+        _db = None
 
 
 async def check_ip_rate_limit(ip: str, survey_code: str) -> None:
     """
     检查 IP 提交频率限制
-    
+
     Args:
         ip: 用户 IP 地址
         survey_code: 问卷代码
-    
+
     Raises:
         HTTPException: 超过限制时抛出
     """
-    settings = get_settings()
-    
-    if not settings.security.rate_limit.enabled:
+    hot = get_hot_config()
+
+    if not hot.rate_limit_enabled:
         return
-    
+
     if not ip:
         return
-    
-    async with _lock:
-        await _ensure_loaded()
-        
-        max_submissions = settings.security.rate_limit.max_submissions_per_day
-        now = datetime.now(timezone.utc).timestamp()
-        one_day_ago = now - 86400  # 24小时前
-        
-        # 获取并清理过期记录
-        submissions = _cache.get("submissions", {})
-        ip_records = submissions.get(ip, [])
-        ip_records = _clean_old_records(ip_records, one_day_ago)
-        
-        # 统计当天提交次数
-        today_count = len(ip_records)
-        
-        if today_count >= max_submissions:
-            raise HTTPException(
-                status_code=429, 
-                detail=f"提交过于频繁，每个 IP 每天最多提交 {max_submissions} 次，请明天再试"
-            )
+
+    max_submissions = hot.max_submissions_per_day
+    now = time.time()
+    one_day_ago = now - WINDOW_SECONDS  # 24小时前
+
+    # 清理过期记录后统计当天提交次数
+    ip_records = _evict_submissions(ip, one_day_ago)
+
+    if len(ip_records) >= max_submissions:
+        raise HTTPException(
+            status_code=429,
+            detail=f"提交过于频繁，每个 IP 每天最多提交 {max_submissions} 次，请明天再试"
+        )
 
 
 async def record_ip_submission(ip: str, survey_code: str) -> None:
     """
     记录 IP 提交（在提交成功后调用）
-    
+
     Args:
         ip: 用户 IP 地址
         survey_code: 问卷代码
     """
-    global _cache_dirty
-    
     if not ip:
         return
-    
-    async with _lock:
-        await _ensure_loaded()
-        
-        now = datetime.now(timezone.utc).timestamp()
-        one_day_ago = now - 86400
-        
-        if "submissions" not in _cache:
-            _cache["submissions"] = {}
-        
-        # 清理过期记录并添加新记录
-        ip_records = _cache["submissions"].get(ip, [])
-        ip_records = _clean_old_records(ip_records, one_day_ago)
-        ip_records.append([now, survey_code])
-        _cache["submissions"][ip] = ip_records
-        
-        _cache_dirty = True
-        await _save_if_dirty()
+
+    _append("submissions", ip, time.time(), survey_code)
 
 
 async def check_upload_rate_limit(ip: Optional[str]) -> None:
     """
     检查 IP 上传频率限制
     基于配置的每日最大提交次数来限制上传，每次提交最多允许上传 5 张图片
-    
+
     Args:
         ip: 用户 IP 地址
-    
+
     Raises:
         HTTPException: 超过限制时抛出
     """
-    settings = get_settings()
-    
-    if not settings.security.rate_limit.enabled:
+    hot = get_hot_config()
+
+    if not hot.rate_limit_enabled:
         return
-    
+
     if not ip:
         return
-    
-    async with _lock:
-        await _ensure_loaded()
-        
-        # 每日最大提交次数 * 每次最多 5 张图片 = 每日最大上传次数
-        max_submissions = settings.security.rate_limit.max_submissions_per_day
-        max_uploads_per_day = max_submissions * 5
-        
-        now = datetime.now(timezone.utc).timestamp()
-        one_day_ago = now - 86400  # 24小时前
-        
-        # 获取并清理过期记录
-        uploads = _cache.get("uploads", {})
-        ip_records = uploads.get(ip, [])
-        ip_records = [ts for ts in ip_records if ts > one_day_ago]
-        
-        # 统计当天上传次数
-        day_count = len(ip_records)
-        
-        if day_count >= max_uploads_per_day:
-            raise HTTPException(
-                status_code=429, 
-                detail=f"上传过于频繁，每个 IP 每天最多上传 {max_uploads_per_day} 张图片"
-            )
+
+    # 每日最大提交次数 * 每次最多 5 张图片 = 每日最大上传次数
+    max_uploads_per_day = hot.max_submissions_per_day * UPLOADS_PER_SUBMISSION
+
+    now = time.time()
+    one_day_ago = now - WINDOW_SECONDS  # 24小时前
+
+    # 清理过期记录后统计当天上传次数
+    ip_records = _records("uploads", ip)
+    _evict(ip_records, one_day_ago)
+
+    if len(ip_records) >= max_uploads_per_day:
+        raise HTTPException(
+            status_code=429,
+            detail=f"上传过于频繁，每个 IP 每天最多上传 {max_uploads_per_day} 张图片"
+        )
 
 
 async def record_ip_upload(ip: Optional[str]) -> None:
     """
     记录 IP 上传（在上传成功后调用）
-    
+
     Args:
         ip: 用户 IP 地址
     """
-    global _cache_dirty
-    
     if not ip:
         return
-    
-    async with _lock:
-        await _ensure_loaded()
-        
-        now = datetime.now(timezone.utc).timestamp()
-        one_day_ago = now - 86400
-        
-        if "uploads" not in _cache:
-            _cache["uploads"] = {}
-        
-        # 清理过期记录并添加新记录
-        ip_records = _cache["uploads"].get(ip, [])
-        ip_records = [ts for ts in ip_records if ts > one_day_ago]
-        ip_records.append(now)
-        _cache["uploads"][ip] = ip_records
-        
-        _cache_dirty = True
-        await _save_if_dirty()
-
-
-async def check_regcode_rate_limit(ip: Optional[str]) -> None:
+
+    _append("uploads", ip, time.time())
+
+
+async def consume_regcode_rate_limit(ip: Optional[str]) -> None:
     """
-    检查领码端点的 IP 频率限制 (独立于提交/上传)。
+    领码端点的 IP 频率限制 (独立于提交/上传): 检查并记录一次领码尝试。
 
     领码端点不走提交的 Turnstile/时间检测三连, 故单独加 IP 限流防滥用。
+    尝试无论成败都计数, 检查与记录之间没有 await, 在事件循环内原子完成, 并发请求不会同时越过上限。
 
     Raises:
-        HTTPException: 超过限制时抛出
+        HTTPException: 超过限制时抛出 (超限的请求不计数)
     """
-    settings = get_settings()
+    hot = get_hot_config()
 
-    if not settings.security.rate_limit.enabled:
+    if not hot.rate_limit_enabled:
         return
 
     if not ip:
         return
 
-    async with _lock:
-        await _ensure_loaded()
+    now = time.time()
+    one_day_ago = now - WINDOW_SECONDS
 
-        now = datetime.now(timezone.utc).timestamp()
-        one_day_ago = now - 86400
+    ip_records = _records("regcodes", ip)
+    _evict(ip_records, one_day_ago)
 
-        regcodes = _cache.get("regcodes", {})
-        ip_records = [ts for ts in regcodes.get(ip, []) if ts > one_day_ago]
-
-        if len(ip_records) >= MAX_REGCODE_ATTEMPTS_PER_DAY:
-            raise HTTPException(
-                status_code=429,
-                detail=f"领码过于频繁, 每个 IP 每天最多 {MAX_REGCODE_ATTEMPTS_PER_DAY} 次, 请稍后再试"
-            )
-
-
-async def record_regcode_attempt(ip: Optional[str]) -> None:
-    """记录一次领码尝试 (无论成功与否, 在领码端点入口处调用)。"""
-    global _cache_dirty
-
-    if not ip:
-        return
-
-    async with _lock:
-        await _ensure_loaded()
-
-        now = datetime.now(timezone.utc).timestamp()
-        one_day_ago = now - 86400
-
-        if "regcodes" not in _cache:
-            _cache["regcodes"] = {}
-
-        ip_records = [ts for ts in _cache["regcodes"].get(ip, []) if ts > one_day_ago]
-        ip_records.append(now)
-        _cache["regcodes"][ip] = ip_records
+    if len(ip_records) >= MAX_REGCODE_ATTEMPTS_PER_DAY:
+        raise HTTPException(
+            status_code=429,
+            detail=f"领码过于频繁, 每个 IP 每天最多 {MAX_REGCODE_ATTEMPTS_PER_DAY} 次, 请稍后再试"
+        )
 
-        _cache_dirty = True
-        await _save_if_dirty()
+    _append("regcodes", ip, now)
 
 
 async def check_query_rate_limit(ip: Optional[str]) -> None:
@@ -303,50 +370,46 @@ async def check_query_rate_limit(ip: Optional[str]) -> None:
     Raises:
         HTTPException: 超过限制时抛出
     """
-    settings = get_settings()
+    hot = get_hot_config()
 
-    if not settings.security.rate_limit.enabled:
+    if not hot.rate_limit_enabled:
         return
 
     if not ip:
         return
 
-    async with _lock:
-        now = datetime.now(timezone.utc).timestamp()
-        recs = [ts for ts in _query_hits.get(ip, []) if ts > now - 60]
-        if len(recs) >= MAX_QUERY_PER_MINUTE:
-            _query_hits[ip] = recs
-            raise HTTPException(
-                status_code=429,
-                detail="查询过于频繁, 请稍候再试"
-            )
-        recs.append(now)
+    now = time.time()
+    recs = [ts for ts in _query_hits.get(ip, []) if ts > now - 60]
+    if len(recs) >= MAX_QUERY_PER_MINUTE:
         _query_hits[ip] = recs
+        raise HTTPException(
+            status_code=429,
+            detail="查询过于频繁, 请稍候再试"
+        )
+    recs.append(now)
+    _query_hits[ip] = recs
 
 
 async def get_rate_limit_stats() -> dict:
     """获取限流统计信息（管理接口用）"""
-    async with _lock:
-        await _ensure_loaded()
-        
-        now = datetime.now(timezone.utc).timestamp()
-        one_day_ago = now - 86400
-        
-        submissions = _cache.get("submissions", {})
-        uploads = _cache.get("uploads", {})
-        
-        # 统计活跃 IP 数量
-        active_submission_ips = sum(
-            1 for records in submissions.values() 
-            if any(r[0] > one_day_ago for r in records)
-        )
-        active_upload_ips = sum(
-            1 for records in uploads.values() 
-            if any(ts > one_day_ago for ts in records)
-        )
-        
-        return {
-            "active_submission_ips": active_submission_ips,
-            "active_upload_ips": active_upload_ips,
-            "total_ips_tracked": len(set(submissions.keys()) | set(uploads.keys())),
-        }
+    now = time.time()
+    one_day_ago = now - WINDOW_SECONDS
+
+    submissions = _cache["submissions"]
+    uploads = _cache["uploads"]
+
+    # 统计活跃 IP 数量 (记录按时间递增, 看队尾即可)
+    active_submission_ips = sum(
+        1 for records in submissions.values()
+        if records and records[-1] > one_day_ago
+    )
+    active_upload_ips = sum(
+        1 for records in uploads.values()
+        if records and records[-1] > one_day_ago
+    )
+
+    return {
+        "active_submission_ips": active_submission_ips,
+        "active_upload_ips": active_upload_ips,
+        "total_ips_tracked": len(set(submissions.keys()) | set(uploads.keys())),
+    }
@@ -0,0 +1,27 @@
+"""
+JSON 响应类 - 使用 orjson 编码
+
+orjson 为 C 实现, 原生序列化 datetime / date / UUID, 接口里无需再预先 .isoformat()。
+naive datetime 输出与 datetime.isoformat() 一致 (不追加时区), 线上格式不变。
+"""
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """orjson 编码的 JSONResponse (FastAPI 自带的 ORJSONResponse 已弃用, 故自行定义)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def success_response(data: Optional[dict] = None, message: Optional[str] = None) -> ORJSONResponse:
+    """
+    直接构造 ApiResponse 结构的成功响应
+
+    路由上仍声明 response_model=ApiResponse 供文档使用; 返回 Response 实例时 FastAPI 不再按
+    response_model 二次校验、也不过 jsonable_encoder, data 由 orjson 一次编码 (可含 orjson.Fragment)。
+    """
+    return ORJSONResponse({"success": True, "data": data, "error": None, "message": message})
@@ -2,12 +2,75 @@
 安全模块 - 处理 Turnstile 验证、提交时间检测
 IP 限流已移至 rate_limit.py 模块
 """
+import hashlib
 import time
 from typing import Optional
 import httpx
 from fastapi import HTTPException
 
-from app.core.config import get_settings
+from app.core.config import get_hot_config
+
+
+TURNSTILE_VERIFY_URL = "https://challenges.cloudflare.com/turnstile/v0/siteverify"
+
+# 共享 HTTP 客户端: 复用 keepalive 连接, 省掉每次提交的 TCP + TLS 握手
+_http_client: Optional[httpx.AsyncClient] = None
+
+# 已验证通过的 token 短期缓存 {sha256(token|ip): 过期时刻}
+# Turnstile token 单次有效, 同一 token 二次提交会被 Cloudflare 判为 timeout-or-duplicate;
+# 提交因业务校验失败 (如漏填必填题) 后玩家修改重提时, 沿用前端同一 token 直接放行
+_VERIFIED_TTL = 120.0
+_VERIFIED_MAX = 1024
+_verified: dict[str, float] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """取共享 HTTP 客户端 (应用启动时创建, 供 Turnstile 与发码服务调用复用)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=32),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """关闭共享 HTTP 客户端 (应用关闭时调用)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _verified_key(token: str, ip: Optional[str]) -> str:
+    return hashlib.sha256(f"{token}|{ip or ''}".encode()).hexdigest()
+
+
+def _take_verified(key: str) -> bool:
+    """取走一条未过期的验证缓存: 检查与删除之间无 await, 并发请求中只有一个能拿到"""
+    expires = _verified.pop(key, None)
+    return expires is not None and expires > time.monotonic()
+
+
+def remember_turnstile(token: Optional[str], ip: Optional[str] = None) -> None:
+    """本地校验未通过、token 未被用于提交时放回验证缓存, 玩家修正后可凭同一 token 重试
+
+    (Cloudflare 侧 token 一次性, 重新验证会报 timeout-or-duplicate)
+    """
+    hot = get_hot_config()
+    if token and hot.turnstile_enabled and hot.turnstile_secret_key:
+        _remember_verified(_verified_key(token, ip))
+
+
+def _remember_verified(key: str) -> None:
+    now = time.monotonic()
+    if len(_verified) >= _VERIFIED_MAX:
+        for k in [k for k, exp in _verified.items() if exp <= now]:
+            del _verified[k]
+        if len(_verified) >= _VERIFIED_MAX:
+            _verified.clear()
+    _verified[key] = now + _VERIFIED_TTL
 
 
 async def verify_turnstile(token: str, ip: Optional[str] = None) -> bool:
@@ -21,15 +84,15 @@ async def verify_turnstile(token: str, ip: Optional[str] = None) -> bool:
     Returns:
         验证是否成功
     """
-    settings = get_settings()
+    hot = get_hot_config()
     
-    if not settings.security.turnstile.enabled:
+    if not hot.turnstile_enabled:
         return True
     
     if not token:
         raise HTTPException(status_code=400, detail="缺少安全验证 token")
     
-    secret_key = settings.security.turnstile.secret_key
+    secret_key = hot.turnstile_secret_key
     if not secret_key:
         # 未配置密钥，跳过验证（开发环境）
         return True
@@ -37,56 +100,59 @@ async def verify_turnstile(token: str, ip: Optional[str] = None) -> bool:
     import logging
     logger = logging.getLogger(__name__)
     
+    # 命中即取走: 一次验证只换一次提交, 缓存不会被并发请求重复使用
+    if _take_verified(_verified_key(token, ip)):
+        logger.info(f"[Turnstile] 命中近期验证缓存, IP: {ip}")
+        return True
+    
     try:
         logger.info(f"[Turnstile] 开始验证, IP: {ip}, token长度: {len(token) if token else 0}")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://challenges.cloudflare.com/turnstile/v0/siteverify",
-                data={
-                    "secret": secret_key,
-                    "response": token,
-                    **({"remoteip": ip} if ip else {}),
-                },
-                timeout=10.0,
-            )
-            result = response.json()
-            
-            logger.info(f"[Turnstile] 验证结果: {result}")
+        response = await get_http_client().post(
+            TURNSTILE_VERIFY_URL,
+            data={
+                "secret": secret_key,
+                "response": token,
+                **({"remoteip": ip} if ip else {}),
+            },
+        )
+        result = response.json()
+        
+        logger.info(f"[Turnstile] 验证结果: {result}")
+        
+        if not result.get("success"):
+            error_codes = result.get("error-codes", [])
+            logger.warning(f"[Turnstile] 验证失败: {error_codes}, token前20字符: {token[:20] if token else 'None'}...")
             
-            if not result.get("success"):
-                error_codes = result.get("error-codes", [])
-                logger.warning(f"[Turnstile] 验证失败: {error_codes}, token前20字符: {token[:20] if token else 'None'}...")
-                
-                # 提供更友好的错误信息
-                error_messages = {
-                    "missing-input-secret": "服务器配置错误: 缺少密钥",
-                    "invalid-input-secret": "服务器配置错误: 密钥无效",
-                    "missing-input-response": "缺少验证token",
-                    "invalid-input-response": "验证token无效或已过期",
-                    "bad-request": "请求格式错误",
-                    "timeout-or-duplicate": "验证已过期或重复使用，请刷新页面重试",
-                    "internal-error": "Cloudflare服务内部错误",
-                }
-                
-                user_message = "安全验证失败"
-                if error_codes:
-                    for code in error_codes:
-                        if code in error_messages:
-                            user_message = error_messages[code]
-                            break
-                    else:
-                        user_message = f"安全验证失败: {', '.join(error_codes)}"
-                
-                raise HTTPException(status_code=400, detail=user_message)
+            # 提供更友好的错误信息
+            error_messages = {
+                "missing-input-secret": "服务器配置错误: 缺少密钥",
+                "invalid-input-secret": "服务器配置错误: 密钥无效",
+                "missing-input-response": "缺少验证token",
+                "invalid-input-response": "验证token无效或已过期",
+                "bad-request": "请求格式错误",
+                "timeout-or-duplicate": "验证已过期或重复使用，请刷新页面重试",
+                "internal-error": "Cloudflare服务内部错误",
+            }
             
-            logger.info(f"[Turnstile] 验证成功")
-            return True
+            user_message = "安全验证失败"
+            if error_codes:
+                for code in error_codes:
+                    if code in error_messages:
+                        user_message = error_messages[code]
+                        break
+                else:
+                    user_message = f"安全验证失败: {', '.join(error_codes)}"
             
+            raise HTTPException(status_code=400, detail=user_message)
+        
+        logger.info(f"[Turnstile] 验证成功")
+        return True
+        
     except httpx.RequestError as e:
         logger.error(f"[Turnstile] 网络错误: {e}")
         # 网络错误时，根据配置决定是否放行
-        if settings.server.debug:
+        if hot.debug:
             return True
         raise HTTPException(status_code=500, detail="安全验证服务暂时不可用")
 
@@ -104,7 +170,7 @@ def check_submit_time(start_time: Optional[float]) -> float:
     Raises:
         HTTPException: 提交时间过短时抛出
     """
-    settings = get_settings()
+    hot = get_hot_config()
     
     if start_time is None:
         # 没有开始时间，跳过检测
@@ -112,8 +178,8 @@ def check_submit_time(start_time: Optional[float]) -> float:
     
     elapsed = time.time() - start_time
     
-    if settings.security.time_check.enabled:
-        min_time = settings.security.time_check.min_submit_time
+    if hot.time_check_enabled:
+        min_time = hot.min_submit_time
         if elapsed < min_time:
             raise HTTPException(
                 status_code=400, 
@@ -123,26 +189,37 @@ def check_submit_time(start_time: Optional[float]) -> float:
     return elapsed
 
 
+# 代理 IP 头部 (小写字节串, 与 ASGI 原始头部一致) -> 优先级, 数值越小越优先
+_PROXY_IP_HEADERS = {
+    b"cf-connecting-ip": 0,  # Cloudflare
+    b"x-forwarded-for": 1,   # 可能包含多个 IP，取第一个
+    b"x-real-ip": 2,
+}
+
+
 def get_real_ip(request) -> Optional[str]:
     """
     获取用户真实 IP 地址
     
-    支持常见的代理头部：
+    支持常见的代理头部 (按优先级):
+    - CF-Connecting-IP (Cloudflare)
     - X-Forwarded-For
     - X-Real-IP
-    - CF-Connecting-IP (Cloudflare)
     """
-    # Cloudflare
-    if cf_ip := request.headers.get("CF-Connecting-IP"):
-        return cf_ip
-    
-    # X-Forwarded-For (可能包含多个 IP，取第一个)
-    if forwarded := request.headers.get("X-Forwarded-For"):
-        return forwarded.split(",")[0].strip()
-    
-    # X-Real-IP
-    if real_ip := request.headers.get("X-Real-IP"):
-        return real_ip
+    # 一次遍历原始头部, 命中最高优先级即停
+    best = None
+    best_rank = len(_PROXY_IP_HEADERS)
+    for name, value in request.headers.raw:
+        rank = _PROXY_IP_HEADERS.get(name)
+        if rank is not None and rank < best_rank and value:
+            best, best_rank = value, rank
+            if rank == 0:
+                break
+    
+    if best is not None:
+        if best_rank == 1:
+            best = best.partition(b",")[0].strip()
+        return best.decode("latin-1")
     
     # 直连
     if request.client:
@@ -155,10 +232,10 @@ def get_security_config() -> dict:
     """
     获取前端需要的安全配置
     """
-    settings = get_settings()
+    hot = get_hot_config()
     
     return {
-        "turnstile_enabled": settings.security.turnstile.enabled,
-        "time_check_enabled": settings.security.time_check.enabled,
-        "min_submit_time": settings.security.time_check.min_submit_time if settings.security.time_check.enabled else 0,
+        "turnstile_enabled": hot.turnstile_enabled,
+        "time_check_enabled": hot.time_check_enabled,
+        "min_submit_time": hot.min_submit_time if hot.time_check_enabled else 0,
     }
@@ -1,3 +1,4 @@
 from app.db.database import Base, get_db, init_db, async_session_maker
+from app.db.sqlite_json import uses_sqlite, iso_datetime, json_bool
 
-__all__ = ["Base", "get_db", "init_db", "async_session_maker"]
+__all__ = ["Base", "get_db", "init_db", "async_session_maker", "uses_sqlite", "iso_datetime", "json_bool"]
@@ -0,0 +1,27 @@
+"""
+SQLite JSON1 投影辅助
+
+列表接口可让 SQLite 用 json_object() 直接产出每行 JSON 文本, 跳过 ORM 实例构造与逐行组装 dict。
+仅 SQLite 可用; 其他方言由调用方回退到 ORM 路径。
+"""
+from sqlalchemy import case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def uses_sqlite(db: AsyncSession) -> bool:
+    """会话是否连到 SQLite (决定能否走 json_object 投影)"""
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def iso_datetime(column):
+    """DateTime 列 -> ISO 8601 文本, 与 datetime.isoformat() 一致
+
+    SQLite 中存为 'YYYY-MM-DD HH:MM:SS.ffffff': 空格换成 T, 微秒为 0 时截掉 (isoformat 不输出 .000000)。
+    """
+    iso = func.replace(column, " ", "T")
+    return case((func.substr(iso, -7) == ".000000", func.substr(iso, 1, 19)), else_=iso)
+
+
+def json_bool(column):
+    """Boolean 列 (SQLite 存 0/1) -> JSON true/false/null"""
+    return func.json(case((column == 1, "true"), (column == 0, "false")))
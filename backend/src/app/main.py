@@ -2,16 +2,21 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 import logging
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from app.core.config import get_settings
+from app.core.config import get_settings, get_hot_config
+from app.core.responses import ORJSONResponse
+from app.core.security import close_http_client, get_http_client
+from app.core import rate_limit
 from app.db import init_db
 from app.api import router
 from app.services.cleanup import CleanupService
+from app.services.activity import ActivityService
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -23,6 +28,10 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时
     settings = get_settings()
+    # 预先生成热路径配置快照, 首个请求不必再派生
+    get_hot_config()
+    # 创建共享 HTTP 客户端, 整个进程复用连接池
+    get_http_client()
     
     # 确保数据目录存在
     Path("data").mkdir(exist_ok=True)
@@ -36,11 +45,19 @@ async def lifespan(app: FastAPI):
     
     # 启动后台清理任务
     CleanupService.start_background_task()
+    # 载入限流事件并启动落盘任务
+    await rate_limit.load()
+    rate_limit.start_persist_task()
+    # 启动活动日志批量落盘任务
+    ActivityService.start_flush_task()
     
     yield
     
     # 关闭时
-    CleanupService.stop_background_task()
+    await CleanupService.stop_background_task()
+    await ActivityService.stop_flush_task()
+    await rate_limit.stop_persist_task()
+    await close_http_client()
     print("👋 Quick-Survey 已关闭")
 
 
@@ -53,6 +70,7 @@ def create_app() -> FastAPI:
         description="问卷调查系统 API",
         version="0.1.0",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
     
     # CORS 中间件
@@ -83,6 +101,14 @@ def create_app() -> FastAPI:
     # 注册路由
     app.include_router(router)
     
+    # HTTP 错误处理器 - 与 FastAPI 默认格式一致 ({"detail": ...}), 改用 orjson 编码
+    @app.exception_handler(StarletteHTTPException)
+    async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+        headers = getattr(exc, "headers", None)
+        if not is_body_allowed_for_status_code(exc.status_code):
+            return Response(status_code=exc.status_code, headers=headers)
+        return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
+    
     # 请求验证错误处理器 - 记录详细的验证错误
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -106,7 +132,7 @@ def create_app() -> FastAPI:
             msg = error.get("msg", "")
             error_messages.append(f"{loc}: {msg}")
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={
                 "success": False,
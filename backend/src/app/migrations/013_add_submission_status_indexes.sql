@@ -0,0 +1,9 @@
+-- 013: 提交表状态相关索引
+-- (status, created_at): 审核列表按状态筛选 + 按提交时间倒序分页; 其 status 前缀也覆盖统计概览按状态分组计数,
+--   无需再建单列 status 索引。
+-- (qq, status) 部分索引: 主群自动准入按 QQ 查已通过提交, 只索引填了 QQ 的行。
+-- player_name 已有 ix_submissions_player_name, 无需再建。
+-- 新库由模型 create_all 直接含这些索引; 已有库执行本迁移。
+
+CREATE INDEX IF NOT EXISTS ix_submissions_status_created_at ON submissions (status, created_at);
+CREATE INDEX IF NOT EXISTS ix_submissions_qq_status ON submissions (qq, status) WHERE qq IS NOT NULL;
@@ -0,0 +1,9 @@
+-- 014: 定时清理与最近活动的复合索引
+-- (status, reviewed_at) 部分索引: 清理任务按 status IN (approved, rejected) AND reviewed_at IS NOT NULL 查已审核提交,
+--   只索引已审核的行。
+-- (action, created_at): 最近活动按 action 筛选 + 按时间倒序分页; 其 action 前缀覆盖单列 ix_activity_logs_action, 故取代之。
+-- 新库由模型 create_all 直接含这些索引; 已有库执行本迁移。
+
+CREATE INDEX IF NOT EXISTS ix_submissions_status_reviewed_at ON submissions (status, reviewed_at) WHERE reviewed_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_activity_logs_action_created_at ON activity_logs (action, created_at);
+DROP INDEX IF EXISTS ix_activity_logs_action;
@@ -0,0 +1,9 @@
+-- 015: questions / submissions 的 survey_id 索引
+-- SQLite 不会为外键自动建索引: 问卷列表按 survey_id 计题目数/提交数、按问卷筛选提交、加载问卷题目,
+-- 有索引即为索引范围计数/查找, 而非全表扫描。
+-- 新库由模型 create_all 直接含这些索引; 已有库执行本迁移。
+
+CREATE INDEX IF NOT EXISTS ix_questions_survey_id ON questions (survey_id);
+-- submissions 直接建 (survey_id, created_at, id): 其 survey_id 前缀服务计数/筛选, 整体服务按问卷筛选后的列表分页 (见 017),
+-- 不再先建单列 survey_id 索引、后又删掉。
+CREATE INDEX IF NOT EXISTS ix_submissions_survey_id_created_at_id ON submissions (survey_id, created_at, id);
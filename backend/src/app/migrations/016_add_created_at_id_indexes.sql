@@ -0,0 +1,7 @@
+-- 016: 列表游标分页索引
+-- 问卷列表 / 审核列表按 (created_at, id) 倒序做 keyset 分页: WHERE (created_at, id) < (?, ?) 走索引直接定位,
+-- 不再 OFFSET 扫描丢弃前面的行。审核列表按状态筛选时由 ix_submissions_status_created_at 覆盖。
+-- 新库由模型 create_all 直接含这些索引; 已有库执行本迁移。
+
+CREATE INDEX IF NOT EXISTS ix_surveys_created_at_id ON surveys (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_submissions_created_at_id ON submissions (created_at, id);
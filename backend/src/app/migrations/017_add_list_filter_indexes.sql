@@ -0,0 +1,11 @@
+-- 017: 列表筛选 + 排序复合索引, answers.submission_id 索引
+-- 问卷列表按 is_active 筛选、审核列表按 survey_id (及 status) 筛选后均按 (created_at, id) 倒序分页:
+-- 等值列在前、排序列在后, 筛选与排序一次索引范围扫描完成, 不再临时排序。
+-- 按 survey_id 筛选的 ix_submissions_survey_id_created_at_id 已由 015 建立。
+-- answers 按 submission_id 加载 / 级联删除, SQLite 不会为外键自动建索引。
+-- player_name 为 LIKE '%...%' 包含匹配, 任何 B-tree 索引都用不上, 不另建。
+-- 新库由模型 create_all 直接含这些索引; 已有库执行本迁移。
+
+CREATE INDEX IF NOT EXISTS ix_surveys_is_active_created_at_id ON surveys (is_active, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_submissions_status_survey_id_created_at ON submissions (status, survey_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_answers_submission_id ON answers (submission_id);
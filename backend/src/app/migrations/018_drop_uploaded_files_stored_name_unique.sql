@@ -0,0 +1,43 @@
+-- 018: uploaded_files.stored_name 去掉唯一约束, 改为普通索引
+-- 上传按内容摘要命名, 内容相同的多次上传共用一个文件; 现每次上传各记一条记录 (原先复用首条记录,
+-- 会把别人的原始文件名返回给后来者), 清理任务据未关联/未审核的记录判断文件是否仍被他人使用。
+-- 新库由模型 create_all 直接建为普通索引; 已有库执行本迁移。
+
+-- SQLite 不支持直接删除列上的 UNIQUE 约束，需要重建表
+
+-- 1. 创建临时表
+CREATE TABLE uploaded_files_new (
+    id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    filename VARCHAR(255) NOT NULL,
+    stored_name VARCHAR(255) NOT NULL,
+    file_path VARCHAR(512) NOT NULL,
+    file_size INTEGER NOT NULL,
+    mime_type VARCHAR(100) NOT NULL,
+    submission_id INTEGER,
+    created_at DATETIME NOT NULL,
+    FOREIGN KEY(submission_id) REFERENCES submissions(id)
+);
+
+-- 2. 复制数据
+INSERT INTO uploaded_files_new (id, filename, stored_name, file_path, file_size, mime_type, submission_id, created_at)
+SELECT id, filename, stored_name, file_path, file_size, mime_type, submission_id, created_at FROM uploaded_files;
+
+-- 2.1 回填 submission_id: 旧版从不关联上传记录, 按答案 content.images 引用的文件名补上所属提交,
+--     否则清理任务会把这些记录当作他人尚未提交的上传而永远保留文件
+UPDATE uploaded_files_new
+SET submission_id = (
+    SELECT MIN(answers.submission_id)
+    FROM answers, json_each(answers.content, '$.images') AS images
+    WHERE json_type(answers.content, '$.images') = 'array'
+      AND replace(images.value, '/uploads/', '') = uploaded_files_new.stored_name
+)
+WHERE submission_id IS NULL;
+
+-- 3. 删除旧表
+DROP TABLE uploaded_files;
+
+-- 4. 重命名新表
+ALTER TABLE uploaded_files_new RENAME TO uploaded_files;
+
+-- 5. 重建索引
+CREATE INDEX IF NOT EXISTS ix_uploaded_files_stored_name ON uploaded_files (stored_name);
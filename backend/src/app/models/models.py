@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import String, Text, Boolean, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import String, Text, Boolean, Integer, DateTime, ForeignKey, JSON, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -14,6 +14,12 @@ def utc_now() -> datetime:
 class Survey(Base):
     """问卷模板"""
     __tablename__ = "surveys"
+    __table_args__ = (
+        # 问卷列表按 (created_at, id) 倒序游标分页
+        Index("ix_surveys_created_at_id", "created_at", "id"),
+        # 按启用状态筛选时同样按 (created_at, id) 倒序, 筛选与排序一次索引范围扫描完成
+        Index("ix_surveys_is_active_created_at_id", "is_active", "created_at", "id"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
@@ -33,7 +39,11 @@ class Survey(Base):
     created_by: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # 创建者 admin_id
     
     # 关系
-    questions: Mapped[list["Question"]] = relationship("Question", back_populates="survey", cascade="all, delete-orphan")
+    # 加载时即按 order 排好 (同 order 按 id), 使用方无需再排序
+    questions: Mapped[list["Question"]] = relationship(
+        "Question", back_populates="survey", cascade="all, delete-orphan",
+        order_by="(Question.order, Question.id)",
+    )
     submissions: Mapped[list["Submission"]] = relationship("Submission", back_populates="survey", cascade="all, delete-orphan")
 
 
@@ -42,7 +52,7 @@ class Question(Base):
     __tablename__ = "questions"
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    survey_id: Mapped[int] = mapped_column(ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False)
+    survey_id: Mapped[int] = mapped_column(ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # 题目内容
     title: Mapped[str] = mapped_column(Text, nullable=False)  # 题目标题
@@ -82,6 +92,22 @@ class Question(Base):
 class Submission(Base):
     """问卷提交"""
     __tablename__ = "submissions"
+    __table_args__ = (
+        # 审核列表按 status 筛选并按时间倒序分页; 前缀 status 兼顾按状态分组计数
+        Index("ix_submissions_status_created_at", "status", "created_at"),
+        # 审核列表不筛状态时按 (created_at, id) 倒序游标分页
+        Index("ix_submissions_created_at_id", "created_at", "id"),
+        # 按问卷筛选 (可再叠加状态) 的审核列表, 筛选后无需再排序; 前缀 survey_id 兼顾按问卷计数
+        Index("ix_submissions_survey_id_created_at_id", "survey_id", "created_at", "id"),
+        Index("ix_submissions_status_survey_id_created_at", "status", "survey_id", "created_at"),
+        # 主群准入按 QQ 查已通过的提交; 只索引填了 QQ 的行
+        Index("ix_submissions_qq_status", "qq", "status", sqlite_where=text("qq IS NOT NULL")),
+        # 定时清理按 status + 已审核筛选; 只索引已审核的行
+        Index(
+            "ix_submissions_status_reviewed_at", "status", "reviewed_at",
+            sqlite_where=text("reviewed_at IS NOT NULL"),
+        ),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     survey_id: Mapped[int] = mapped_column(ForeignKey("surveys.id", ondelete="CASCADE"), nullable=False)
@@ -124,7 +150,7 @@ class Answer(Base):
     __tablename__ = "answers"
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    submission_id: Mapped[int] = mapped_column(ForeignKey("submissions.id", ondelete="CASCADE"), nullable=False)
+    submission_id: Mapped[int] = mapped_column(ForeignKey("submissions.id", ondelete="CASCADE"), nullable=False, index=True)
     question_id: Mapped[int] = mapped_column(ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
     
     # 回答内容 (JSON)
@@ -151,7 +177,8 @@ class UploadedFile(Base):
     
     # 文件信息
     filename: Mapped[str] = mapped_column(String(255), nullable=False)  # 原始文件名
-    stored_name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)  # 存储文件名
+    # 存储文件名 (按内容摘要命名): 内容相同的多次上传各有一条记录, 共用同一文件名, 故不唯一
+    stored_name: Mapped[str] = mapped_column(String(255), index=True, nullable=False)
     file_path: Mapped[str] = mapped_column(String(512), nullable=False)  # 存储路径
     file_size: Mapped[int] = mapped_column(Integer, nullable=False)  # 文件大小 (bytes)
     mime_type: Mapped[str] = mapped_column(String(100), nullable=False)  # MIME 类型
@@ -166,11 +193,15 @@ class UploadedFile(Base):
 class ActivityLog(Base):
     """活动日志"""
     __tablename__ = "activity_logs"
+    __table_args__ = (
+        # 最近活动按 action 筛选并按时间倒序分页; 前缀 action 兼顾单按 action 过滤
+        Index("ix_activity_logs_action_created_at", "action", "created_at"),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     
     # 活动类型: submit (提交问卷), approved (审核通过), rejected (审核拒绝)
-    action: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    action: Mapped[str] = mapped_column(String(20), nullable=False)
     
     # 目标玩家名
     player_name: Mapped[str] = mapped_column(String(64), nullable=False)
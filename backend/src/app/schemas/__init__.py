@@ -10,6 +10,7 @@ from app.schemas.schemas import (
     SurveyUpdate,
     SurveyResponse,
     SurveyDetailResponse,
+    PublicQuestionResponse,
     PublicSurveyResponse,
     AnswerSubmit,
     SubmissionCreate,
@@ -32,6 +33,7 @@ __all__ = [
     "SurveyUpdate",
     "SurveyResponse",
     "SurveyDetailResponse",
+    "PublicQuestionResponse",
     "PublicSurveyResponse",
     "AnswerSubmit",
     "SubmissionCreate",
@@ -1,9 +1,13 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 import re
 from pydantic import BaseModel, Field, field_validator
 
 
+# 玩家名清理用的正则, 模块加载时编译一次
+_TAG_RE = re.compile(r'<[^>]*>')
+_EVENT_ATTR_RE = re.compile(r'on\w+\s*=', re.IGNORECASE)
+
 # ==================== 通用响应 ====================
 
 class ApiResponse(BaseModel):
@@ -151,11 +155,30 @@ class SurveyDetailResponse(BaseModel):
 
 # ==================== 公开问卷（玩家端）====================
 
+class PublicQuestionResponse(BaseModel):
+    """公开问卷中的题目（不含 is_pinned / order 等管理字段）
+
+    options / validation / condition 按库中 JSON 原样透传, 不再逐项校验。
+    """
+    id: int
+    title: str
+    description: Optional[str]
+    type: str
+    options: Any
+    is_required: bool
+    validation: Any
+    condition: Any = None
+    role: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class PublicSurveyResponse(BaseModel):
     """公开问卷响应（给玩家看的）"""
     title: str
     description: Optional[str]
-    questions: list[QuestionResponse]
+    questions: list[PublicQuestionResponse]
 
 
 # ==================== 提交相关 ====================
@@ -186,8 +209,12 @@ class SubmissionCreate(BaseModel):
         """
         if v is None:
             return v
-        v = re.sub(r'<[^>]*>', '', v)
-        v = re.sub(r'on\w+\s*=', '', v, flags=re.IGNORECASE)
+        # 两步顺序不可合并: 先去标签可能拼出新的 on...= 片段, 需由第二步再清。
+        # 普通玩家名不含 '<' / '=', 两个正则都不会命中, 直接跳过
+        if '<' in v:
+            v = _TAG_RE.sub('', v)
+        if '=' in v:
+            v = _EVENT_ATTR_RE.sub('', v)
         return v.strip()
 
 
@@ -1,53 +1,105 @@
 """活动日志服务"""
+import asyncio
+import contextlib
+import logging
 from typing import Optional
 from datetime import datetime, timezone
-from sqlalchemy import select, func, desc
+from sqlalchemy import select, func, desc, insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.db import async_session_maker, iso_datetime
 from app.models import ActivityLog
+from app.models.models import utc_now
+
+logger = logging.getLogger(__name__)
+
+# 活动日志写缓冲: 每 FLUSH_INTERVAL 秒批量插入一次; 库持续不可写时最多积压 MAX_PENDING 条, 超出丢弃
+FLUSH_INTERVAL = 1
+MAX_PENDING = 10_000
 
 
 class ActivityService:
-    """活动日志服务"""
+    """活动日志服务
+
+    提交/审核路径只把日志追加进内存缓冲, 由后台任务批量 INSERT 落库,
+    不再为每条日志单独 commit + refresh。进程崩溃最多丢失最近 FLUSH_INTERVAL 秒的日志。
+    """
     
-    @staticmethod
-    async def log_submit(
-        db: AsyncSession,
-        player_name: str,
-        submission_id: int,
-    ) -> ActivityLog:
+    _pending: list[dict] = []
+    _flush_task: Optional[asyncio.Task] = None
+    
+    @classmethod
+    def _append(cls, **values) -> None:
+        if len(cls._pending) >= MAX_PENDING:
+            logger.warning("活动日志积压已达 %d 条, 丢弃新日志", MAX_PENDING)
+            return
+        # 时间戳在记录时取, 而非落库时
+        values["created_at"] = utc_now()
+        cls._pending.append(values)
+    
+    @classmethod
+    def log_submit(cls, player_name: str, submission_id: int) -> None:
         """记录问卷提交"""
-        log = ActivityLog(
-            action="submit",
-            player_name=player_name,
-            submission_id=submission_id,
-        )
-        db.add(log)
-        await db.commit()
-        await db.refresh(log)
-        return log
+        cls._append(action="submit", player_name=player_name, submission_id=submission_id)
     
-    @staticmethod
-    async def log_review(
-        db: AsyncSession,
+    @classmethod
+    def log_review(
+        cls,
         player_name: str,
         submission_id: int,
         status: str,  # approved 或 rejected
         operator: Optional[str] = None,
         note: Optional[str] = None,
-    ) -> ActivityLog:
+    ) -> None:
         """记录审核操作"""
-        log = ActivityLog(
+        cls._append(
             action=status,  # approved 或 rejected
             player_name=player_name,
             submission_id=submission_id,
             operator=operator,
             note=note,
         )
-        db.add(log)
-        await db.commit()
-        await db.refresh(log)
-        return log
+    
+    @classmethod
+    async def flush(cls) -> None:
+        """把缓冲的活动日志用一条批量 INSERT 写入 (一次事务); 失败时放回缓冲等下次重试"""
+        if not cls._pending:
+            return
+        batch, cls._pending = cls._pending, []
+        try:
+            async with async_session_maker() as db:
+                await db.execute(insert(ActivityLog), batch)
+                await db.commit()
+        except BaseException:
+            cls._pending[:0] = batch[: MAX_PENDING - len(cls._pending)]
+            raise
+    
+    @classmethod
+    async def _flush_loop(cls) -> None:
+        """后台落盘循环"""
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await cls.flush()
+            except Exception:
+                logger.warning("活动日志落盘失败", exc_info=True)
+    
+    @classmethod
+    def start_flush_task(cls) -> None:
+        """启动后台落盘任务"""
+        if cls._flush_task is None or cls._flush_task.done():
+            cls._flush_task = asyncio.create_task(cls._flush_loop())
+    
+    @classmethod
+    async def stop_flush_task(cls) -> None:
+        """停止后台任务并落盘剩余日志"""
+        task, cls._flush_task = cls._flush_task, None
+        if task is not None:
+            # 等任务真正退出再做最后一次落盘: 若正停在 flush 的 await 上, 其批次会先放回缓冲, 不会与之并发写入
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await cls.flush()
     
     @staticmethod
     async def get_recent_activities(
@@ -56,23 +108,55 @@ class ActivityService:
         offset: int = 0,
         action: Optional[str] = None,
     ) -> tuple[list[ActivityLog], int]:
-        """获取最近活动"""
-        query = select(ActivityLog)
-        count_query = select(func.count(ActivityLog.id))
-        
-        if action:
-            query = query.where(ActivityLog.action == action)
-            count_query = count_query.where(ActivityLog.action == action)
-        
-        # 获取总数
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
-        
-        # 分页
-        query = query.order_by(desc(ActivityLog.created_at))
-        query = query.offset(offset).limit(limit)
-        
-        result = await db.execute(query)
-        logs = result.scalars().all()
-        
-        return list(logs), total
+        """获取最近活动 (总数由 COUNT(*) OVER () 随分页行一并返回, 一次查询)"""
+        conds = [ActivityLog.action == action] if action else []
+        query = (
+            select(ActivityLog, func.count().over().label("total"))
+            .where(*conds)
+            .order_by(desc(ActivityLog.created_at))
+            .offset(offset)
+            .limit(limit)
+        )
+        rows = (await db.execute(query)).all()
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+        return [], await ActivityService._count_activities(db, conds, offset)
+    
+    @staticmethod
+    async def _count_activities(db: AsyncSession, conds: list, offset: int) -> int:
+        """分页为空时补查总数: offset 越过末尾时窗口计数无行可带回, 只有 offset 为 0 才能确定总数为 0"""
+        if offset == 0:
+            return 0
+        return await db.scalar(select(func.count(ActivityLog.id)).where(*conds)) or 0
+    
+    @staticmethod
+    async def get_recent_activities_json(
+        db: AsyncSession,
+        limit: int = 10,
+        offset: int = 0,
+        action: Optional[str] = None,
+    ) -> tuple[list[str], int]:
+        """获取最近活动 (仅 SQLite): 由 json_object 直接返回每行 JSON 文本, 字段同列表接口"""
+        conds = [ActivityLog.action == action] if action else []
+        query = (
+            select(
+                func.json_object(
+                    "id", ActivityLog.id,
+                    "action", ActivityLog.action,
+                    "player_name", ActivityLog.player_name,
+                    "operator", ActivityLog.operator,
+                    "submission_id", ActivityLog.submission_id,
+                    "note", ActivityLog.note,
+                    "created_at", iso_datetime(ActivityLog.created_at),
+                ),
+                func.count().over().label("total"),
+            )
+            .where(*conds)
+            .order_by(desc(ActivityLog.created_at))
+            .offset(offset)
+            .limit(limit)
+        )
+        rows = (await db.execute(query)).all()
+        if rows:
+            return [row[0] for row in rows], rows[0].total
+        return [], await ActivityService._count_activities(db, conds, offset)
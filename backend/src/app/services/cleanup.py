@@ -5,29 +5,116 @@
 """
 
 import os
+import time
 import asyncio
+import contextlib
 import logging
 from pathlib import Path
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Union
 
-from sqlalchemy import select, and_
+import aiofiles.os
+
+from sqlalchemy import select, delete, func, and_, or_, not_, true, union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from app.db import async_session_maker
+from app.db import async_session_maker, uses_sqlite
 from app.models import Submission, Answer, UploadedFile
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# 清理时同时进行的文件删除数上限
+DELETE_CONCURRENCY = 32
+# 等待下次清理时按墙上时间重新校准的间隔 (秒)
+CLEANUP_RECHECK_SECONDS = 3600
+# 清理出错后的重试退避 (秒): 从 1 分钟起倍增, 上限 1 小时
+CLEANUP_RETRY_MIN_SECONDS = 60
+CLEANUP_RETRY_MAX_SECONDS = 3600
+# 关闭时等待进行中的清理提交的上限 (秒)
+CLEANUP_STOP_TIMEOUT_SECONDS = 30
+
 
 class CleanupService:
     """清理服务"""
     
     _task: Optional[asyncio.Task] = None
-    _running: bool = False
-    
+    _stop_event: asyncio.Event = asyncio.Event()
+
+    @staticmethod
+    async def _remove_files(
+        files: Iterable[tuple[Union[str, Path], Optional[int]]], error_msg: str
+    ) -> tuple[int, int]:
+        """
+        并发删除一批文件, 返回 (删除个数, 释放字节数)。
+
+        files 为 (路径, 已知大小) 序列, 大小为 None 时先 stat 一次取得;
+        删除走 aiofiles.os 线程池, 由信号量限制同时进行的文件操作数, 不阻塞事件循环。
+        文件已不存在时静默跳过。
+        """
+        sem = asyncio.Semaphore(DELETE_CONCURRENCY)
+
+        async def _rm(path, size: Optional[int]) -> Optional[int]:
+            async with sem:
+                try:
+                    if size is None:
+                        size = (await aiofiles.os.stat(path)).st_size
+                    await aiofiles.os.remove(path)
+                except FileNotFoundError:
+                    return None
+                except Exception:
+                    logger.exception(error_msg, path)
+                    return None
+                return size
+
+        sizes = [size for size in await asyncio.gather(*(_rm(p, s) for p, s in files)) if size is not None]
+        return len(sizes), sum(sizes)
+
+    @staticmethod
+    async def _answer_image_names(db: AsyncSession, *criteria) -> set[str]:
+        """满足条件的答案所引用的图片文件名 (已去掉 /uploads/ 前缀)"""
+        if uses_sqlite(db):
+            # json_each 在库内展开 images 数组, 只回传图片路径
+            images = func.json_each(Answer.content, "$.images").table_valued("value")
+            result = await db.execute(
+                select(func.replace(images.c.value, "/uploads/", ""))
+                .distinct()
+                .select_from(Answer)
+                .join(images, true())
+                .where(func.json_type(Answer.content, "$.images") == "array", *criteria)
+            )
+            return {row[0] for row in result}
+
+        result = await db.execute(select(Answer.content).where(*criteria))
+        return {
+            image_path.replace("/uploads/", "")
+            for (content,) in result
+            for image_path in (content or {}).get("images", [])
+        }
+
+    @staticmethod
+    async def _pending_upload_names(
+        db: AsyncSession, unreviewed_ids, cutoff: datetime, names: Optional[Iterable[str]] = None
+    ) -> set[str]:
+        """
+        仍有他人上传记录的文件名: 记录所属提交仍存在且未审核, 或尚未关联提交且上传不超过孤立文件期限。
+
+        超期仍未关联的记录 (放弃的上传、同一图片重复上传多出的记录) 与指向已删除提交的记录不再算作占用,
+        免得文件永远删不掉。
+        names 给出时只查这些文件名。
+        """
+        query = (
+            select(UploadedFile.stored_name)
+            .distinct()
+            .where(or_(
+                and_(UploadedFile.submission_id.is_(None), UploadedFile.created_at >= cutoff),
+                UploadedFile.submission_id.in_(unreviewed_ids),
+            ))
+        )
+        if names is not None:
+            query = query.where(UploadedFile.stored_name.in_(names))
+        return set(await db.scalars(query))
+
     @classmethod
     async def cleanup_reviewed_submissions(cls, db: AsyncSession) -> dict:
         """
@@ -40,6 +127,9 @@ class CleanupService:
         删除:
         - answers.content.images 指向的 uploads/ 图片文件, 并把该答案的 images 置空
         - uploaded_files 表中的文件记录及其磁盘文件
+
+        仍被未审核提交引用、或仍有上传记录未关联到已审核提交的图片 (内容去重后共用同一文件) 暂不删除;
+        未关联提交的上传记录超过 cleanup.orphan_file_hours 后不再算作占用。
         """
         settings = get_settings()
         upload_dir = Path(settings.upload.path)
@@ -52,71 +142,94 @@ class CleanupService:
         }
 
         # 查找已审核的提交（状态为 approved 或 rejected）
-        # 使用 selectinload 预加载 answers 关系，避免异步懒加载问题
-        query = select(Submission).options(
-            selectinload(Submission.answers)
-        ).where(
-            and_(
-                Submission.status.in_(["approved", "rejected"]),
-                Submission.reviewed_at.isnot(None),
-            )
+        reviewed = and_(
+            Submission.status.in_(["approved", "rejected"]),
+            Submission.reviewed_at.isnot(None),
         )
-        result = await db.execute(query)
-        submissions = result.scalars().all()
+        reviewed_ids = select(Submission.id).where(reviewed)
+        unreviewed_ids = select(Submission.id).where(not_(reviewed))
 
-        for submission in submissions:
-            submission_touched = False
+        # 上传按内容命名, 同一文件可能被多份提交引用: 仍被未审核提交引用的图片不删,
+        # 其引用也留在答案里, 待对方审核后的下一轮再清
+        in_use = await cls._answer_image_names(db, Answer.submission_id.notin_(reviewed_ids))
+        # 同一文件还有别人的上传记录 (尚未提交, 或所属提交未审核) 时同样不删, 免得删掉对方正要提交的图片
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.cleanup.orphan_file_hours)
+        in_use |= await cls._pending_upload_names(db, unreviewed_ids, cutoff)
 
-            for answer in submission.answers:
-                content = answer.content or {}
-                images = content.get("images", [])
-                # 已清理过(或非图片题)的答案没有图片引用, 跳过 -> 任务对已处理提交幂等
-                if not images:
-                    continue
+        # 只取已审核提交中仍带图片引用的答案: 已清理过的答案 (任务对已处理提交幂等) 与非图片题不再读出;
+        # 已审核提交只增不减, 逐行流式读取, 不把整批结果先缓冲成列表
+        query = select(Answer).where(Answer.submission_id.in_(reviewed_ids))
+        if uses_sqlite(db):
+            query = query.where(func.json_array_length(Answer.content, "$.images") > 0)
+        answers = await db.stream_scalars(query)
+
+        # 待删除的文件名先收集起来, 最后一次性并发删除
+        image_names: set[str] = set()
+        touched_submissions: set[int] = set()
+        async for answer in answers:
+            content = answer.content or {}
+            images = content.get("images", [])
+            # 已清理过(或非图片题)的答案没有图片引用, 跳过; 非数组的 images 不当作引用 (同孤立文件清理)
+            if not images or not isinstance(images, list):
+                continue
+
+            kept = []
+            for image_path in images:
+                # 图片路径格式: /uploads/xxx.jpg
+                filename = image_path.replace("/uploads/", "")
+                if filename in in_use:
+                    kept.append(image_path)
+                else:
+                    image_names.add(filename)
+            if len(kept) == len(images):
+                continue
+
+            # 清空图片引用但保留答案行。JSON 列须整体重新赋值, SQLAlchemy 才会标记为脏并落库。
+            new_content = dict(content)
+            new_content["images"] = kept
+            answer.content = new_content
+            stats["images_cleared"] += len(images) - len(kept)
+            touched_submissions.add(answer.submission_id)
+
+        stats["submissions_cleaned"] = len(touched_submissions)
 
-                for image_path in images:
-                    # 图片路径格式: /uploads/xxx.jpg
-                    filename = image_path.replace("/uploads/", "")
-                    file_path = upload_dir / filename
-
-                    if file_path.exists():
-                        try:
-                            file_size = file_path.stat().st_size
-                            os.remove(file_path)
-                            stats["files_deleted"] += 1
-                            stats["bytes_freed"] += file_size
-                        except Exception:
-                            logger.exception("[Cleanup] 删除答案附图失败: %s", file_path)
-
-                # 清空图片引用但保留答案行。JSON 列须整体重新赋值, SQLAlchemy 才会标记为脏并落库。
-                new_content = dict(content)
-                new_content["images"] = []
-                answer.content = new_content
-                stats["images_cleared"] += len(images)
-                submission_touched = True
-
-            if submission_touched:
-                stats["submissions_cleaned"] += 1
-
-        # 删除关联的上传文件记录
-        file_query = select(UploadedFile).where(
-            UploadedFile.submission_id.in_([s.id for s in submissions])
+        # 删除关联的上传文件: 只取路径删磁盘文件, 记录用一条 DELETE 批量删除 (不逐行 db.delete)
+        file_result = await db.execute(
+            select(UploadedFile.stored_name, UploadedFile.file_path)
+            .where(UploadedFile.submission_id.in_(reviewed_ids))
         )
-        file_result = await db.execute(file_query)
-        uploaded_files = file_result.scalars().all()
+        stored_files = {
+            stored_name: stored_path
+            for stored_name, stored_path in file_result
+            if stored_name not in in_use
+        }
+        # 流式扫描期间可能有内容相同的新上传复用了同一文件: 删除前在同一事务内按候选文件名再查一次, 仍有记录的跳过
+        still_used = await cls._pending_upload_names(
+            db, unreviewed_ids, cutoff, image_names | stored_files.keys()
+        )
+        # 如果文件还存在，也删除
+        removed, freed = await cls._remove_files(
+            ((upload_dir / name, None) for name in image_names - still_used),
+            "[Cleanup] 删除答案附图失败: %s",
+        )
+        stats["files_deleted"] += removed
+        stats["bytes_freed"] += freed
+        removed, freed = await cls._remove_files(
+            (
+                (stored_path, None)
+                for stored_name, stored_path in stored_files.items()
+                if stored_name not in still_used
+            ),
+            "[Cleanup] 删除已记录上传文件失败: %s",
+        )
+        stats["files_deleted"] += removed
+        stats["bytes_freed"] += freed
         
-        for uploaded_file in uploaded_files:
-            # 如果文件还存在，也删除
-            file_path = Path(uploaded_file.file_path)
-            if file_path.exists():
-                try:
-                    file_size = file_path.stat().st_size
-                    os.remove(file_path)
-                    stats["files_deleted"] += 1
-                    stats["bytes_freed"] += file_size
-                except Exception:
-                    logger.exception("[Cleanup] 删除已记录上传文件失败: %s", file_path)
-            await db.delete(uploaded_file)
+        await db.execute(
+            delete(UploadedFile)
+            .where(UploadedFile.submission_id.in_(reviewed_ids))
+            .execution_options(synchronize_session=False)
+        )
         
         await db.commit()
         
@@ -143,45 +256,59 @@ class CleanupService:
         threshold_seconds = settings.cleanup.orphan_file_hours * 60 * 60  # 从配置读取
         
         async with async_session_maker() as db:
-            # 获取所有数据库中记录的文件名
-            query = select(UploadedFile.stored_name)
-            result = await db.execute(query)
-            db_filenames = set(row[0] for row in result.fetchall())
-            
-            # 同时从答案中获取引用的图片
-            answer_query = select(Answer.content)
-            answer_result = await db.execute(answer_query)
-            
-            for row in answer_result.fetchall():
-                content = row[0] or {}
-                images = content.get("images", [])
-                for image_path in images:
-                    filename = image_path.replace("/uploads/", "")
-                    db_filenames.add(filename)
+            if uses_sqlite(db):
+                # SQLite: 上传记录文件名与答案引用图片用一条 UNION 查询取回, 库内完成去重;
+                # json_each 在库内展开 images 数组并去掉 /uploads/ 前缀, 不把整列 JSON 读进 Python
+                images = func.json_each(Answer.content, "$.images").table_valued("value")
+                referenced = union(
+                    select(UploadedFile.stored_name),
+                    select(func.replace(images.c.value, "/uploads/", ""))
+                    .select_from(Answer)
+                    .join(images, true())
+                    .where(func.json_type(Answer.content, "$.images") == "array"),
+                )
+                result = await db.execute(referenced)
+                db_filenames = {row[0] for row in result}
+            else:
+                # 获取所有数据库中记录的文件名
+                query = select(UploadedFile.stored_name)
+                result = await db.execute(query)
+                db_filenames = set(row[0] for row in result.fetchall())
+
+                # 同时从答案中获取引用的图片
+                answer_query = select(Answer.content)
+                answer_result = await db.execute(answer_query)
+                
+                for row in answer_result.fetchall():
+                    content = row[0] or {}
+                    images = content.get("images", [])
+                    for image_path in images:
+                        filename = image_path.replace("/uploads/", "")
+                        db_filenames.add(filename)
         
-        # 遍历上传目录
-        for file_path in upload_dir.iterdir():
-            if not file_path.is_file():
-                continue
-            
-            filename = file_path.name
-            
-            # 如果文件在数据库中有记录，跳过
-            if filename in db_filenames:
-                continue
-            
-            # 检查文件年龄
-            file_mtime = datetime.fromtimestamp(file_path.stat().st_mtime, tz=timezone.utc)
-            age_seconds = (now - file_mtime).total_seconds()
-            
-            if age_seconds > threshold_seconds:
+        # 遍历上传目录: scandir 复用目录项自带的类型信息, 每个候选文件只 stat 一次
+        cutoff = now.timestamp() - threshold_seconds
+        expired: list[tuple[str, int]] = []
+        with os.scandir(upload_dir) as entries:
+            for entry in entries:
+                # 如果文件在数据库中有记录，跳过 (先比文件名, 已引用的文件不必 stat)
+                if entry.name in db_filenames:
+                    continue
+
                 try:
-                    file_size = file_path.stat().st_size
-                    os.remove(file_path)
-                    stats["orphan_files_deleted"] += 1
-                    stats["bytes_freed"] += file_size
-                except Exception as e:
-                    print(f"[Cleanup] 删除孤立文件失败: {file_path}, 错误: {e}")
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+
+                # 检查文件年龄
+                if st.st_mtime < cutoff:
+                    expired.append((entry.path, st.st_size))
+
+        removed, freed = await cls._remove_files(expired, "[Cleanup] 删除孤立文件失败: %s")
+        stats["orphan_files_deleted"] += removed
+        stats["bytes_freed"] += freed
         
         return stats
     
@@ -233,39 +360,57 @@ class CleanupService:
         
         return total_stats
     
+    @staticmethod
+    def _next_run_after(now: datetime, run_hour: int, interval_days: int) -> datetime:
+        """下一个执行时间点 (本地时区, 带时区信息); run_hour 按服务器本地时间理解"""
+        next_run = now.replace(hour=run_hour, minute=0, second=0, microsecond=0)
+        if now.hour >= run_hour:
+            # 如果已经过了今天的执行时间，等到下一个周期
+            next_run = next_run + timedelta(days=interval_days)
+        # 按目标日期重新解析本地时区偏移, 跨夏令时切换也落在墙上时间的整点
+        return next_run.replace(tzinfo=None).astimezone()
+
+    @classmethod
+    async def _wait_stop(cls, timeout: float) -> bool:
+        """等待 timeout 秒或停止信号; 收到停止信号返回 True"""
+        try:
+            await asyncio.wait_for(cls._stop_event.wait(), timeout=max(timeout, 0))
+        except asyncio.TimeoutError:
+            pass
+        return cls._stop_event.is_set()
+
     @classmethod
     async def _cleanup_loop(cls):
         """后台清理循环 - 根据配置的间隔执行"""
         settings = get_settings()
+        run_hour = settings.cleanup.run_hour
+        interval_days = settings.cleanup.interval_days
+        retry_delay = CLEANUP_RETRY_MIN_SECONDS
         
-        while cls._running:
+        while not cls._stop_event.is_set():
             try:
-                now = datetime.now()
-                run_hour = settings.cleanup.run_hour
-                interval_days = settings.cleanup.interval_days
-                
-                # 计算到下一个执行时间点的秒数
-                next_run = now.replace(hour=run_hour, minute=0, second=0, microsecond=0)
-                if now.hour >= run_hour:
-                    # 如果已经过了今天的执行时间，等到下一个周期
-                    from datetime import timedelta
-                    next_run = next_run + timedelta(days=interval_days)
-                
-                wait_seconds = (next_run - now).total_seconds()
+                next_run = cls._next_run_after(datetime.now().astimezone(), run_hour, interval_days)
                 print(f"[Cleanup] 清理间隔: {interval_days}天, 执行时间: {run_hour}:00")
-                print(f"[Cleanup] 下次清理时间: {next_run}, 等待 {wait_seconds/3600:.1f} 小时")
+                print(f"[Cleanup] 下次清理时间: {next_run}, "
+                      f"等待 {(next_run.timestamp() - time.time()) / 3600:.1f} 小时")
                 
-                await asyncio.sleep(wait_seconds)
+                # asyncio 的超时按单调时钟计; 分段等待并每段按墙上时间重算剩余秒数,
+                # 系统校时 (NTP) 后最多一段之内即对齐到目标时间点
+                while (remaining := next_run.timestamp() - time.time()) > 0:
+                    if await cls._wait_stop(min(remaining, CLEANUP_RECHECK_SECONDS)):
+                        return
                 
-                if cls._running:
-                    await cls.run_cleanup()
+                await cls.run_cleanup()
+                retry_delay = CLEANUP_RETRY_MIN_SECONDS
                     
             except asyncio.CancelledError:
                 break
-            except Exception as e:
-                print(f"[Cleanup] 清理循环错误: {e}")
-                # 出错后等待 1 小时再重试
-                await asyncio.sleep(3600)
+            except Exception:
+                logger.exception("[Cleanup] 清理循环错误, %d 秒后重试", retry_delay)
+                # 出错后指数退避重试, 上限 1 小时
+                if await cls._wait_stop(retry_delay):
+                    return
+                retry_delay = min(retry_delay * 2, CLEANUP_RETRY_MAX_SECONDS)
     
     @classmethod
     def start_background_task(cls):
@@ -277,14 +422,22 @@ class CleanupService:
             return
         
         if cls._task is None or cls._task.done():
-            cls._running = True
+            cls._stop_event = asyncio.Event()
             cls._task = asyncio.create_task(cls._cleanup_loop())
             print(f"[Cleanup] 后台清理任务已启动 (间隔: {settings.cleanup.interval_days}天, 时间: {settings.cleanup.run_hour}:00)")
     
     @classmethod
-    def stop_background_task(cls):
-        """停止后台清理任务"""
-        cls._running = False
-        if cls._task and not cls._task.done():
-            cls._task.cancel()
-            print("[Cleanup] 后台清理任务已停止")
+    async def stop_background_task(cls, timeout: float = CLEANUP_STOP_TIMEOUT_SECONDS) -> None:
+        """停止后台清理任务: 等待中立即退出; 正在执行的清理照常提交后再退出, 超过 timeout 秒才取消"""
+        task, cls._task = cls._task, None
+        if task is None or task.done():
+            return
+        cls._stop_event.set()
+        # 等任务真正退出: 否则事件循环关闭时会取消进行中的清理, 可能已删文件却未提交, 答案仍指向已删图片
+        _, pending = await asyncio.wait({task}, timeout=timeout)
+        if pending:
+            logger.warning("[Cleanup] 清理任务 %.0f 秒内未结束, 取消", timeout)
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        print("[Cleanup] 后台清理任务已停止")
@@ -0,0 +1,41 @@
+"""
+列表总数缓存 (进程内 TTL)。
+
+问卷列表 / 审核列表每翻一页都要 COUNT(*) 一次筛选结果, 表大时这条计数本身就是一次索引全扫描。
+这里按筛选条件缓存总数 TTL_SECONDS 秒: 分页总数只用于显示页码, 短时间内差几条可以接受。
+结果小于 THRESHOLD 时计数很便宜, 不缓存, 小表的总数始终精确。
+"""
+import time
+from typing import Awaitable, Callable, Hashable
+
+TTL_SECONDS = 30
+# 只缓存不小于该值的总数
+THRESHOLD = 1000
+MAX_ENTRIES = 256
+
+_cache: dict[Hashable, tuple[float, int]] = {}
+
+
+async def get_or_count(key: Hashable, counter: Callable[[], Awaitable[int]]) -> int:
+    """命中未过期的缓存直接返回; 否则调用 counter 计数, 结果够大才缓存。"""
+    entry = _cache.get(key)
+    now = time.monotonic()
+    if entry and entry[0] > now:
+        return entry[1]
+
+    total = await counter()
+    if total >= THRESHOLD:
+        if len(_cache) >= MAX_ENTRIES:
+            for k in [k for k, (expires, _) in _cache.items() if expires <= now]:
+                del _cache[k]
+            if len(_cache) >= MAX_ENTRIES:
+                _cache.clear()
+        _cache[key] = (time.monotonic() + TTL_SECONDS, total)
+    else:
+        _cache.pop(key, None)
+    return total
+
+
+def invalidate() -> None:
+    """清空全部缓存。"""
+    _cache.clear()
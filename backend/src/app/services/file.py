@@ -1,8 +1,13 @@
+import os
 import uuid
+import asyncio
+import hashlib
 import aiofiles
+import aiofiles.os
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
+from functools import lru_cache
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import UploadFile, HTTPException, status
 
@@ -10,24 +15,32 @@ from app.core.config import get_settings
 from app.models import UploadedFile
 
 
+# 上传分块大小 (1 MiB)
+CHUNK_SIZE = 1 << 20
+
+
+@lru_cache
+def _ensure_dir(path: str) -> Path:
+    """创建上传目录; 按路径缓存, 每个目录只 mkdir 一次"""
+    upload_path = Path(path)
+    upload_path.mkdir(parents=True, exist_ok=True)
+    return upload_path
+
+
 class FileService:
     """文件上传服务"""
     
     @staticmethod
     def get_upload_dir() -> Path:
         """获取上传目录"""
-        settings = get_settings()
-        upload_path = Path(settings.upload.path)
-        upload_path.mkdir(parents=True, exist_ok=True)
-        return upload_path
+        return _ensure_dir(get_settings().upload.path)
     
     @staticmethod
-    def generate_filename(original_name: str) -> str:
-        """生成唯一文件名"""
+    def generate_filename(original_name: str, digest: str) -> str:
+        """按内容摘要生成文件名: 同一天内容相同的上传得到同一个文件名"""
         ext = Path(original_name).suffix.lower()
-        unique_id = uuid.uuid4().hex[:16]
         timestamp = datetime.now().strftime("%Y%m%d")
-        return f"{timestamp}_{unique_id}{ext}"
+        return f"{timestamp}_{digest}{ext}"
     
     @classmethod
     async def save_file(
@@ -37,36 +50,55 @@ class FileService:
         submission_id: Optional[int] = None,
     ) -> UploadedFile:
         """保存上传的文件"""
-        settings = get_settings()
+        upload = get_settings().upload
         
         # 验证文件类型
-        if file.content_type not in settings.upload.allowed_types:
+        if file.content_type not in upload.allowed_type_set:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"不支持的文件类型: {file.content_type}"
             )
         
-        # 读取文件内容
-        content = await file.read()
-        file_size = len(content)
-        
-        # 验证文件大小
-        if file_size > settings.upload.max_size_bytes:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"文件大小超过限制: {settings.upload.max_size_mb}MB"
-            )
-        
-        # 生成文件名和路径
-        stored_name = cls.generate_filename(file.filename or "upload.jpg")
-        upload_dir = cls.get_upload_dir()
-        file_path = upload_dir / stored_name
+        upload_dir = _ensure_dir(upload.path)
+        max_size = upload.max_size_bytes
+        too_large = HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"文件大小超过限制: {upload.max_size_mb}MB"
+        )
+        # multipart 已给出大小的直接拒绝, 不落盘
+        if file.size is not None and file.size > max_size:
+            raise too_large
         
-        # 保存文件
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
+        # 分块写入临时文件并同步计算内容摘要: 内存占用与文件大小无关, 超限即中止并删除半截文件;
+        # 写完再原子 rename 到最终文件名, 静态目录里不会出现写了一半的图片
+        tmp_path = upload_dir / f".{uuid.uuid4().hex}.part"
+        hasher = hashlib.blake2b(digest_size=16)
+        file_size = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while chunk := await file.read(CHUNK_SIZE):
+                    file_size += len(chunk)
+                    if file_size > max_size:
+                        raise too_large
+                    hasher.update(chunk)
+                    await f.write(chunk)
+
+            stored_name = cls.generate_filename(file.filename or "upload.jpg", hasher.hexdigest())
+            file_path = upload_dir / stored_name
+            try:
+                # 相同内容已存储过: 刷新修改时间, 孤立文件清理按年龄判断时视作新上传
+                await asyncio.to_thread(os.utime, file_path)
+            except FileNotFoundError:
+                await aiofiles.os.replace(tmp_path, file_path)
+            else:
+                # 复用已有文件, 丢弃临时文件
+                await aiofiles.os.remove(tmp_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        # 创建数据库记录
+        # 创建数据库记录: 每次上传各记一条 (内容相同的上传共用磁盘文件而不共用记录),
+        # 清理任务据此得知该文件仍有尚未提交/审核的上传者
         uploaded_file = UploadedFile(
             filename=file.filename or "upload",
             stored_name=stored_name,
@@ -78,10 +110,10 @@ class FileService:
         
         db.add(uploaded_file)
         await db.commit()
-        await db.refresh(uploaded_file)
+        # 列值均由 Python 侧给出, 提交后实例仍有效 (expire_on_commit=False), 无需 refresh 回查
         
         return uploaded_file
-    
+
     @staticmethod
     def get_file_url(stored_name: str) -> str:
         """获取文件访问 URL"""
@@ -9,6 +9,7 @@ import httpx
 from fastapi import HTTPException
 
 from app.core.config import get_settings
+from app.core.security import get_http_client
 
 
 async def issue_registration_code(player_name: str) -> dict:
@@ -30,13 +31,13 @@ async def issue_registration_code(player_name: str) -> dict:
 
     url = f"{base}/api/v1/whitelist/regcode"
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                url,
-                json={"name": player_name},
-                headers={"X-API-Key": api_key},
-                timeout=10.0,
-            )
+        # 复用共享客户端的 keepalive 连接, 不再每次领码新建连接池
+        resp = await get_http_client().post(
+            url,
+            json={"name": player_name},
+            headers={"X-API-Key": api_key},
+            timeout=10.0,
+        )
     except httpx.RequestError as e:
         raise HTTPException(status_code=502, detail="无法连接发码服务, 请稍后重试") from e
 
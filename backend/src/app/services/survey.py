@@ -2,17 +2,45 @@ import secrets
 import random
 from typing import Optional
 from datetime import datetime, timezone
-from sqlalchemy import select, func, delete, String, and_
+from sqlalchemy import Row, select, func, delete, insert, update, lambda_stmt, String, and_, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, joinedload
 
-from app.models import Survey, Question, Submission, Answer
+from app.db import async_session_maker, iso_datetime, json_bool
+from app.models import Survey, Question, Submission, Answer, UploadedFile, BotNotification
+from app.services import count_cache, survey_cache
 from app.schemas import (
     SurveyCreate, SurveyUpdate, QuestionCreate, QuestionUpdate,
     SubmissionCreate, SubmissionReview
 )
 
 
+# 题目 / 答案批量 INSERT 语句: 模块级复用同一语句对象, 每次提交只绑定参数
+_QUESTION_INSERT = insert(Question)
+_ANSWER_INSERT = insert(Answer)
+
+# 问卷访问码字母表: 大写字母 + 数字, 去掉易混淆的 O/0/I/1 (玩家需手抄或口头转述链接)
+_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 8
+
+
+# 访问码撞上 code 唯一索引时重新生成的次数上限
+CODE_ATTEMPTS = 5
+
+
+def _generate_code() -> str:
+    """随机生成问卷访问码: 32^8 = 2^40 种; 撞 code 唯一索引时由 create_survey 重试"""
+    return "".join(secrets.choice(_CODE_ALPHABET) for _ in range(CODE_LENGTH))
+
+
+def _question_values(data: QuestionCreate) -> dict:
+    """题目入库字段: 一次 model_dump 连同嵌套的选项/规则一起在 pydantic-core 内转为 dict"""
+    values = data.model_dump()
+    values["options"] = values["options"] or None  # 空选项列表按无选项存
+    return values
+
+
 class SurveyService:
     """问卷服务"""
     
@@ -23,57 +51,63 @@ class SurveyService:
         created_by: Optional[int] = None
     ) -> Survey:
         """创建问卷"""
-        # 使用问卷标题生成简单的访问码
-        code = secrets.token_urlsafe(8)[:8]
-        survey = Survey(
-            title=data.title,
-            description=data.description,
-            code=code,
-            is_random=data.is_random,
-            random_count=data.random_count,
-            created_by=created_by,
-        )
-        
-        # 添加问题
-        for i, q_data in enumerate(data.questions):
-            question = Question(
-                title=q_data.title,
-                description=q_data.description,
-                type=q_data.type,
-                options=[opt.model_dump() for opt in q_data.options] if q_data.options else None,
-                is_required=q_data.is_required,
-                is_pinned=q_data.is_pinned,
-                order=q_data.order if q_data.order else i,
-                validation=q_data.validation.model_dump() if q_data.validation else None,
-                condition=q_data.condition.model_dump() if q_data.condition else None,
-                role=q_data.role,
+        # 访问码靠 code 唯一索引判重: 撞码时回滚并换一个码重试, 不先查再插
+        for attempt in range(CODE_ATTEMPTS):
+            survey = Survey(
+                title=data.title,
+                description=data.description,
+                code=_generate_code(),
+                is_random=data.is_random,
+                random_count=data.random_count,
+                created_by=created_by,
             )
-            survey.questions.append(question)
+            db.add(survey)
+            try:
+                await db.flush()
+                break
+            except IntegrityError:
+                await db.rollback()
+                if attempt == CODE_ATTEMPTS - 1:
+                    raise
         
-        db.add(survey)
+        # 题目走 ORM 批量 INSERT (一次 executemany), 不逐题 INSERT ... RETURNING:
+        # SQLite 无法保证 RETURNING 顺序, 经关系级联添加的子对象只能一条一条插入以回填主键
+        if data.questions:
+            await db.execute(_QUESTION_INSERT, [
+                {
+                    **_question_values(q_data),
+                    "survey_id": survey.id,
+                    "order": q_data.order if q_data.order else i,
+                }
+                for i, q_data in enumerate(data.questions)
+            ])
         await db.commit()
-        await db.refresh(survey)
+        # 新问卷默认激活, 可能顶替当前的 "active" 问卷
+        survey_cache.invalidate()
+        # 列默认值均在 Python 侧生成, 提交后实例列属性已完整 (expire_on_commit=False), 无需 refresh 回查;
+        # questions 关系未加载, 需要时另行查询
         return survey
     
     @staticmethod
     async def get_survey_by_id(db: AsyncSession, survey_id: int) -> Optional[Survey]:
-        """通过 ID 获取问卷"""
-        result = await db.execute(
-            select(Survey)
-            .options(selectinload(Survey.questions))
+        """通过 ID 获取问卷 (按主键取单个问卷, 题目数有限: JOIN 一条查询带出, 不再另发 IN 查询)"""
+        result = await db.execute(lambda_stmt(
+            lambda: select(Survey)
+            .options(joinedload(Survey.questions))
             .where(Survey.id == survey_id)
-        )
-        return result.scalar_one_or_none()
+        ))
+        return result.unique().scalar_one_or_none()
     
     @staticmethod
     async def get_survey_by_code(db: AsyncSession, code: str) -> Optional[Survey]:
-        """通过访问码获取问卷"""
-        result = await db.execute(
-            select(Survey)
-            .options(selectinload(Survey.questions))
+        """通过访问码获取问卷 (提交热路径: lambda_stmt 按代码位置缓存语句, 免去每次构建与计算缓存键)"""
+        # 题目同 get_survey_by_id 用 JOIN 带出
+        result = await db.execute(lambda_stmt(
+            lambda: select(Survey)
+            .options(joinedload(Survey.questions))
             .where(Survey.code == code)
-        )
-        return result.scalar_one_or_none()
+        ))
+        return result.unique().scalar_one_or_none()
     
     @staticmethod
     async def get_active_survey(db: AsyncSession) -> Optional[Survey]:
@@ -94,46 +128,99 @@ class SurveyService:
         size: int = 20,
         search: Optional[str] = None,
         is_active: Optional[bool] = None,
-    ) -> tuple[list[Survey], int]:
-        """获取问卷列表"""
-        query = select(Survey)
-        count_query = select(func.count(Survey.id))
+    ) -> tuple[list[Row], int]:
+        """获取问卷列表: 每行为列表字段 + 问题数/提交数 (见 _list_query), 不加载 ORM 实体"""
+        conds = SurveyService._survey_filters(search, is_active)
         
-        if search:
-            query = query.where(Survey.title.contains(search))
-            count_query = count_query.where(Survey.title.contains(search))
-        
-        if is_active is not None:
-            query = query.where(Survey.is_active == is_active)
-            count_query = count_query.where(Survey.is_active == is_active)
-        
-        # 获取总数
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
+        # 获取总数 (大结果集的总数短时缓存, 见 count_cache)
+        total = await count_cache.get_or_count(
+            ("surveys", search, is_active),
+            lambda: db.scalar(select(func.count(Survey.id)).where(*conds)),
+        ) or 0
         
         # 分页
-        query = query.order_by(Survey.created_at.desc())
+        query = SurveyService._list_query().where(*conds)
+        query = query.order_by(Survey.created_at.desc(), Survey.id.desc())
         query = query.offset((page - 1) * size).limit(size)
         
         result = await db.execute(query)
-        surveys = result.scalars().all()
+        return result.all(), total
+    
+    @staticmethod
+    async def get_surveys_after(
+        db: AsyncSession,
+        cursor: tuple[datetime, int],
+        size: int = 20,
+        search: Optional[str] = None,
+        is_active: Optional[bool] = None,
+    ) -> list[Row]:
+        """游标分页: 取 (created_at, id) 排在游标之后的一页, 不做 OFFSET 扫描也不计总数; 行同 get_surveys"""
+        created_at, survey_id = cursor
+        conds = SurveyService._survey_filters(search, is_active)
+        conds.append(tuple_(Survey.created_at, Survey.id) < tuple_(created_at, survey_id))
         
-        return list(surveys), total
+        result = await db.execute(
+            SurveyService._list_query()
+            .where(*conds)
+            .order_by(Survey.created_at.desc(), Survey.id.desc())
+            .limit(size)
+        )
+        return result.all()
     
     @staticmethod
-    async def get_survey_stats(db: AsyncSession) -> dict:
-        """获取问卷统计"""
-        # 启用中的问卷数
-        active_result = await db.execute(
-            select(func.count(Survey.id)).where(Survey.is_active == True)
+    def _survey_filters(search: Optional[str] = None, is_active: Optional[bool] = None) -> list:
+        """列表与计数共用的筛选条件"""
+        conds = []
+        if search:
+            conds.append(Survey.title.contains(search))
+        if is_active is not None:
+            conds.append(Survey.is_active == is_active)
+        return conds
+    
+    @staticmethod
+    def _count_columns() -> tuple:
+        """问题数 / 提交数: 与 Survey 相关联的标量子查询, 各走 survey_id 索引计数"""
+        question_count = (
+            select(func.count())
+            .where(Question.survey_id == Survey.id)
+            .correlate(Survey)
+            .scalar_subquery()
+            .label("question_count")
         )
-        active = active_result.scalar() or 0
-        
-        # 已停用的问卷数
-        inactive_result = await db.execute(
-            select(func.count(Survey.id)).where(Survey.is_active == False)
+        submission_count = (
+            select(func.count())
+            .where(Submission.survey_id == Survey.id)
+            .correlate(Survey)
+            .scalar_subquery()
+            .label("submission_count")
+        )
+        return question_count, submission_count
+    
+    @staticmethod
+    def _list_query():
+        """问卷列表投影: 只取列表展示的列并带上计数, 一条查询出整页, 免去实体构建与单独的计数查询"""
+        return select(
+            Survey.id,
+            Survey.title,
+            Survey.description,
+            Survey.code,
+            Survey.is_active,
+            Survey.is_random,
+            Survey.random_count,
+            Survey.created_at,
+            Survey.updated_at,
+            *SurveyService._count_columns(),
+        )
+    
+    @staticmethod
+    async def get_survey_stats(db: AsyncSession) -> dict:
+        """获取问卷统计: 一条 GROUP BY is_active 查询同时得到启用/停用数"""
+        rows = await db.execute(
+            select(Survey.is_active, func.count(Survey.id)).group_by(Survey.is_active)
         )
-        inactive = inactive_result.scalar() or 0
+        counts = dict(rows.all())
+        active = counts.get(True, 0)
+        inactive = counts.get(False, 0)
         
         return {
             "active": active,
@@ -144,45 +231,67 @@ class SurveyService:
     @staticmethod
     async def update_survey(
         db: AsyncSession, 
-        survey: Survey, 
+        survey_id: int, 
         data: SurveyUpdate
-    ) -> Survey:
-        """更新问卷"""
-        update_data = data.model_dump(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(survey, field, value)
+    ) -> bool:
+        """更新问卷: 一条 UPDATE 按 id 写入补丁, 不先加载问卷及其题目; 问卷不存在返回 False"""
+        values = data.model_dump(exclude_unset=True)
+        values["updated_at"] = datetime.now(timezone.utc)
         
-        survey.updated_at = datetime.now(timezone.utc)
-        await db.commit()
-        await db.refresh(survey)
-        return survey
-    
-    @staticmethod
-    async def delete_survey(db: AsyncSession, survey: Survey) -> None:
-        """删除问卷"""
-        await db.delete(survey)
-        await db.commit()
-    
-    @staticmethod
-    async def get_question_count(db: AsyncSession, survey_id: int) -> int:
-        """获取问卷的问题数量"""
         result = await db.execute(
-            select(func.count(Question.id)).where(Question.survey_id == survey_id)
+            update(Survey)
+            .where(Survey.id == survey_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
         )
-        return result.scalar() or 0
+        await db.commit()
+        if not result.rowcount:
+            return False
+        survey_cache.invalidate()
+        return True
     
     @staticmethod
-    async def get_submission_count(db: AsyncSession, survey_id: int) -> int:
-        """获取问卷的提交数量"""
+    async def delete_survey(db: AsyncSession, survey_id: int) -> bool:
+        """删除问卷及其题目、提交与答案; 问卷不存在返回 False
+        
+        不走 ORM 级联 (会先把全部提交与答案读进内存再逐行 DELETE), 改为按子表到父表的顺序各一条 Core DELETE。
+        SQLite 未开启外键约束, ON DELETE CASCADE 不生效, 故子表显式删除。除原 ORM 级联的答案外,
+        提交认领的上传记录与机器人通知也一并删除, 不留指向已删提交的行; 上传文件本身交给孤立文件清理。
+        """
+        submission_ids = select(Submission.id).where(Submission.survey_id == survey_id)
+        question_ids = select(Question.id).where(Question.survey_id == survey_id)
+        for stmt in (
+            delete(Answer).where(
+                Answer.submission_id.in_(submission_ids) | Answer.question_id.in_(question_ids)
+            ),
+            delete(UploadedFile).where(UploadedFile.submission_id.in_(submission_ids)),
+            delete(BotNotification).where(BotNotification.submission_id.in_(submission_ids)),
+            delete(Submission).where(Submission.survey_id == survey_id),
+            delete(Question).where(Question.survey_id == survey_id),
+        ):
+            await db.execute(stmt.execution_options(synchronize_session=False))
         result = await db.execute(
-            select(func.count(Submission.id)).where(Submission.survey_id == survey_id)
+            delete(Survey).where(Survey.id == survey_id).execution_options(synchronize_session=False)
         )
-        return result.scalar() or 0
+        await db.commit()
+        if not result.rowcount:
+            return False
+        survey_cache.invalidate()
+        return True
 
 
 class QuestionService:
     """问题服务"""
     
+    @staticmethod
+    async def _touch_survey(db: AsyncSession, survey_id: int) -> None:
+        """题目变更时同步刷新所属问卷的 updated_at (问卷详情的 ETag 以此为版本)"""
+        await db.execute(
+            update(Survey)
+            .where(Survey.id == survey_id)
+            .values(updated_at=datetime.now(timezone.utc))
+        )
+    
     @staticmethod
     async def add_question(
         db: AsyncSession, 
@@ -190,22 +299,11 @@ class QuestionService:
         data: QuestionCreate
     ) -> Question:
         """添加问题"""
-        question = Question(
-            survey_id=survey_id,
-            title=data.title,
-            description=data.description,
-            type=data.type,
-            options=[opt.model_dump() for opt in data.options] if data.options else None,
-            is_required=data.is_required,
-            is_pinned=data.is_pinned,
-            order=data.order,
-            validation=data.validation.model_dump() if data.validation else None,
-            condition=data.condition.model_dump() if data.condition else None,
-            role=data.role,
-        )
+        question = Question(survey_id=survey_id, **_question_values(data))
         db.add(question)
+        await QuestionService._touch_survey(db, survey_id)
         await db.commit()
-        await db.refresh(question)
+        survey_cache.invalidate()
         return question
     
     @staticmethod
@@ -226,18 +324,17 @@ class QuestionService:
         """更新问题"""
         update_data = data.model_dump(exclude_unset=True)
         
-        if "options" in update_data and update_data["options"]:
-            update_data["options"] = [opt.model_dump() for opt in data.options]
-        if "validation" in update_data and update_data["validation"]:
-            update_data["validation"] = data.validation.model_dump()
-        if "condition" in update_data and update_data["condition"]:
-            update_data["condition"] = data.condition.model_dump()
+        # exclude_unset 会连嵌套模型的未设字段一并去掉; 传入的选项/规则再整体 dump 一次补齐默认值
+        nested = {k for k in ("options", "validation", "condition") if update_data.get(k)}
+        if nested:
+            update_data.update(data.model_dump(include=nested))
         
         for field, value in update_data.items():
             setattr(question, field, value)
         
+        await QuestionService._touch_survey(db, question.survey_id)
         await db.commit()
-        await db.refresh(question)
+        survey_cache.invalidate()
         return question
     
     @staticmethod
@@ -247,7 +344,9 @@ class QuestionService:
         for answer in question.answers:
             await db.delete(answer)
         await db.delete(question)
+        await QuestionService._touch_survey(db, question.survey_id)
         await db.commit()
+        survey_cache.invalidate()
 
 
 class SubmissionService:
@@ -275,24 +374,57 @@ class SubmissionService:
             token=secrets.token_urlsafe(32),
         )
         
-        # 添加答案
-        for answer_data in data.answers:
-            answer = Answer(
-                question_id=answer_data.question_id,
-                content=answer_data.content,
-            )
-            submission.answers.append(answer)
-        
         db.add(submission)
+        await db.flush()
+        
+        # 答案走 ORM 批量 INSERT (一次 executemany), 理由同 create_survey
+        if data.answers:
+            await db.execute(_ANSWER_INSERT, [
+                {
+                    "submission_id": submission.id,
+                    "question_id": answer_data.question_id,
+                    "content": answer_data.content,
+                }
+                for answer_data in data.answers
+            ])
+            await SubmissionService._claim_uploads(db, submission.id, data)
         await db.commit()
-        await db.refresh(submission)
+        # 列默认值均在 Python 侧生成, 提交后实例列属性已完整 (expire_on_commit=False), 无需 refresh 回查;
+        # answers 关系未加载, 需要时另行查询
         return submission
     
+    @staticmethod
+    async def _claim_uploads(db: AsyncSession, submission_id: int, data: SubmissionCreate) -> None:
+        """把答案引用的图片关联到本提交: 每个文件名认领一条尚未关联的上传记录
+
+        内容相同的上传共用文件名而各有一条记录, 只认领一条, 其余上传者的记录仍未关联, 清理时据此保留文件。
+        """
+        image_names = {
+            image_path.replace("/uploads/", "")
+            for answer_data in data.answers
+            if isinstance(images := answer_data.content.get("images"), list)
+            for image_path in images
+            if isinstance(image_path, str)
+        }
+        if not image_names:
+            return
+        unclaimed = (
+            select(func.min(UploadedFile.id))
+            .where(UploadedFile.submission_id.is_(None), UploadedFile.stored_name.in_(image_names))
+            .group_by(UploadedFile.stored_name)
+        )
+        await db.execute(
+            update(UploadedFile)
+            .where(UploadedFile.id.in_(unclaimed))
+            .values(submission_id=submission_id)
+            .execution_options(synchronize_session=False)
+        )
+
     @staticmethod
     async def get_submission_by_id(
         db: AsyncSession, 
         submission_id: int,
-        mark_viewed: bool = False,
+        load_questions: bool = False,
     ) -> Optional[Submission]:
         """
         通过 ID 获取提交
@@ -300,25 +432,36 @@ class SubmissionService:
         Args:
             db: 数据库会话
             submission_id: 提交 ID
-            mark_viewed: 是否标记首次查看时间
+            load_questions: 是否连同 submission.survey.questions 一并预加载 (详情页渲染答案用)
         """
+        # survey 是多对一, JOIN 同一条查询带出; answers/questions 是一对多, 各一条 IN 查询
+        survey_loader = joinedload(Submission.survey)
+        if load_questions:
+            survey_loader = survey_loader.selectinload(Survey.questions)
         result = await db.execute(
             select(Submission)
             .options(
                 selectinload(Submission.answers),
-                selectinload(Submission.survey),
+                survey_loader,
             )
             .where(Submission.id == submission_id)
         )
-        submission = result.scalar_one_or_none()
-        
-        # 如果需要标记首次查看时间，且之前未查看过
-        if submission and mark_viewed and submission.first_viewed_at is None:
-            submission.first_viewed_at = datetime.now(timezone.utc)
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def mark_viewed(submission_id: int, viewed_at: datetime) -> None:
+        """记录首次查看时间 (已有则不覆盖)
+
+        供详情接口以 BackgroundTasks 在响应发出后调用, 故自开短会话, 不复用已关闭的请求会话。
+        """
+        async with async_session_maker() as db:
+            await db.execute(
+                update(Submission)
+                .where(Submission.id == submission_id, Submission.first_viewed_at.is_(None))
+                .values(first_viewed_at=viewed_at)
+                .execution_options(synchronize_session=False)
+            )
             await db.commit()
-            await db.refresh(submission)
-        
-        return submission
     
     @staticmethod
     async def get_submissions(
@@ -328,35 +471,144 @@ class SubmissionService:
         status: Optional[str] = None,
         survey_id: Optional[int] = None,
         player_name: Optional[str] = None,
-    ) -> tuple[list[Submission], int]:
-        """获取提交列表"""
-        query = select(Submission).options(selectinload(Submission.survey))
-        count_query = select(func.count(Submission.id))
-        
-        if status:
-            query = query.where(Submission.status == status)
-            count_query = count_query.where(Submission.status == status)
-        
-        if survey_id:
-            query = query.where(Submission.survey_id == survey_id)
-            count_query = count_query.where(Submission.survey_id == survey_id)
-        
-        if player_name:
-            query = query.where(Submission.player_name.contains(player_name))
-            count_query = count_query.where(Submission.player_name.contains(player_name))
-        
-        # 获取总数
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> tuple[list[dict], Optional[int]]:
+        """获取提交列表: 只查列表所需的列, 每行直接是审核列表接口的字段 dict (不构造 ORM 实例)
+
+        after 为游标 (created_at, id) 时按 keyset 取其后一页, 忽略 page 且不计总数 (总数返回 None)。
+        """
+        conds = SubmissionService._submission_filters(status, survey_id, player_name)
+        total = await SubmissionService._page_total(db, conds, after, status, survey_id, player_name)
         
-        # 分页
-        query = query.order_by(Submission.created_at.desc())
-        query = query.offset((page - 1) * size).limit(size)
+        query = (
+            select(
+                Submission.id,
+                Submission.survey_id,
+                func.coalesce(Survey.title, "").label("survey_title"),
+                Submission.player_name,
+                Submission.qq,
+                Submission.status,
+                Submission.in_review_group,
+                Submission.created_at,
+                Submission.reviewed_at,
+            )
+            .outerjoin(Survey, Survey.id == Submission.survey_id)
+        )
+        query = SubmissionService._paginate(query, conds, page, size, after)
         
         result = await db.execute(query)
-        submissions = result.scalars().all()
+        return [dict(row) for row in result.mappings()], total
+    
+    @staticmethod
+    async def get_submissions_json(
+        db: AsyncSession,
+        page: int = 1,
+        size: int = 20,
+        status: Optional[str] = None,
+        survey_id: Optional[int] = None,
+        player_name: Optional[str] = None,
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> tuple[list[str], Optional[int]]:
+        """获取提交列表 (仅 SQLite): 由 json_object 直接返回每行 JSON 文本, 字段同审核列表接口; after 同 get_submissions"""
+        conds = SubmissionService._submission_filters(status, survey_id, player_name)
+        total = await SubmissionService._page_total(db, conds, after, status, survey_id, player_name)
         
-        return list(submissions), total
+        query = (
+            select(func.json_object(
+                "id", Submission.id,
+                "survey_id", Submission.survey_id,
+                "survey_title", func.coalesce(Survey.title, ""),
+                "player_name", Submission.player_name,
+                "qq", Submission.qq,
+                "status", Submission.status,
+                "in_review_group", json_bool(Submission.in_review_group),
+                "created_at", iso_datetime(Submission.created_at),
+                "reviewed_at", iso_datetime(Submission.reviewed_at),
+            ))
+            .select_from(Submission)
+            .outerjoin(Survey, Survey.id == Submission.survey_id)
+        )
+        query = SubmissionService._paginate(query, conds, page, size, after)
+        result = await db.execute(query)
+        return result.scalars().all(), total
+    
+    @staticmethod
+    def _paginate(query, conds: list, page: int, size: int, after: Optional[tuple[datetime, int]]):
+        """审核列表排序与分页: 按 (created_at, id) 倒序; 有游标走 keyset, 否则 OFFSET"""
+        if after is not None:
+            conds = [*conds, tuple_(Submission.created_at, Submission.id) < tuple_(*after)]
+        query = query.where(*conds).order_by(Submission.created_at.desc(), Submission.id.desc())
+        if after is None:
+            query = query.offset((page - 1) * size)
+        return query.limit(size)
+    
+    @staticmethod
+    async def _page_total(
+        db: AsyncSession,
+        conds: list,
+        after: Optional[tuple[datetime, int]],
+        status: Optional[str],
+        survey_id: Optional[int],
+        player_name: Optional[str],
+    ) -> Optional[int]:
+        """OFFSET 分页取总数; 游标分页不计总数"""
+        if after is not None:
+            return None
+        return await SubmissionService._list_total(db, conds, status, survey_id, player_name)
+    
+    @staticmethod
+    def _submission_filters(
+        status: Optional[str] = None,
+        survey_id: Optional[int] = None,
+        player_name: Optional[str] = None,
+    ) -> list:
+        """列表与计数共用的筛选条件"""
+        conds = []
+        if status:
+            conds.append(Submission.status == status)
+        if survey_id:
+            conds.append(Submission.survey_id == survey_id)
+        if player_name:
+            conds.append(Submission.player_name.contains(player_name))
+        return conds
+    
+    @staticmethod
+    async def _list_total(
+        db: AsyncSession,
+        conds: list,
+        status: Optional[str],
+        survey_id: Optional[int],
+        player_name: Optional[str],
+    ) -> int:
+        """审核列表分页总数 (大结果集短时缓存, 见 count_cache); 统计接口仍用精确的 count_submissions"""
+        return await count_cache.get_or_count(
+            ("submissions", status, survey_id, player_name),
+            lambda: SubmissionService._count(db, conds),
+        )
+    
+    @staticmethod
+    async def _count(db: AsyncSession, conds: list) -> int:
+        return await db.scalar(select(func.count()).select_from(Submission).where(*conds)) or 0
+    
+    @staticmethod
+    async def count_submissions(
+        db: AsyncSession,
+        status: Optional[str] = None,
+        survey_id: Optional[int] = None,
+        player_name: Optional[str] = None,
+    ) -> int:
+        """只取提交总数: 裸 COUNT(*), 不做排序/分页/预加载, 也不构造 ORM 对象"""
+        return await SubmissionService._count(
+            db, SubmissionService._submission_filters(status, survey_id, player_name)
+        )
+    
+    @staticmethod
+    async def get_status_counts(db: AsyncSession) -> dict[str, int]:
+        """按审核状态分组计数 (一次 GROUP BY, 代替逐状态各查一次 COUNT)。无提交的状态不出现在结果中。"""
+        result = await db.execute(
+            select(Submission.status, func.count()).group_by(Submission.status)
+        )
+        return {status: count for status, count in result.all()}
     
     @staticmethod
     async def review_submission(
@@ -372,35 +624,31 @@ class SubmissionService:
         submission.reviewed_at = datetime.now(timezone.utc)
         
         await db.commit()
-        await db.refresh(submission)
         return submission
     
     @staticmethod
-    async def get_random_questions(survey: Survey) -> list[Question]:
-        """获取随机题目（用于随机题库）
+    def pick_questions(items: list, pinned: list[bool], random_count: int) -> list:
+        """随机抽题 (ORM 题目与缓存的题目 dict 共用)
         
         随机抽题逻辑：
-        1. 保留题目（is_pinned=True）始终出现
+        1. 保留题目（pinned[i]=True）始终出现
         2. 从非保留题目中随机抽取，使总数达到 random_count
+        结果保持 items 原有顺序 (调用方传入按 order 排好的列表)。
         """
-        questions = list(survey.questions)
+        # 一趟遍历拆分保留/普通题目下标
+        pinned_idx, unpinned_idx = [], []
+        for i, p in enumerate(pinned):
+            (pinned_idx if p else unpinned_idx).append(i)
         
-        if survey.is_random and survey.random_count:
-            # 分离保留题目和普通题目
-            pinned = [q for q in questions if q.is_pinned]
-            unpinned = [q for q in questions if not q.is_pinned]
-            
-            # 计算需要从普通题目中抽取的数量
-            remaining_count = max(0, survey.random_count - len(pinned))
-            remaining_count = min(remaining_count, len(unpinned))
-            
-            # 随机抽取普通题目
-            selected_unpinned = random.sample(unpinned, remaining_count) if remaining_count > 0 else []
-            
-            # 合并保留题目和随机抽取的题目
-            questions = pinned + selected_unpinned
+        # 计算需要从普通题目中抽取的数量
+        remaining_count = max(0, random_count - len(pinned_idx))
+        if remaining_count >= len(unpinned_idx):
+            return list(items)  # 普通题目全部入选, 无需抽取
         
-        return sorted(questions, key=lambda q: q.order)
+        # 随机抽取普通题目, 与保留题目合并后按原顺序输出
+        selected = pinned_idx + (random.sample(unpinned_idx, remaining_count) if remaining_count > 0 else [])
+        selected.sort()
+        return [items[i] for i in selected]
     
     @staticmethod
     async def get_submission_by_token(
@@ -417,7 +665,7 @@ class SubmissionService:
             return None
         result = await db.execute(
             select(Submission)
-            .options(selectinload(Submission.survey))
+            .options(joinedload(Submission.survey))
             .where(Submission.token == token)
         )
         return result.scalar_one_or_none()
@@ -460,5 +708,4 @@ class SubmissionService:
 
         submission.code_issued_at = datetime.now(timezone.utc)
         await db.commit()
-        await db.refresh(submission)
         return "ok", code_data
@@ -0,0 +1,62 @@
+"""
+公开问卷读缓存 (进程内 TTL)。
+
+玩家每次打开问卷页都会拉 /public/survey/active 或 /public/surveys/{code}, 而问卷内容只在管理员编辑时变化。
+这里缓存组装好的公开快照 (纯 dict, 不缓存 ORM 对象), 命中时省掉一次 SQL 往返与逐题组装。
+管理端增删改问卷/题目后调用 invalidate() 整体清空: 条目极少, 整体清空比按 key 精确失效更不易漏。
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Hashable, Optional
+
+# 兜底过期时间: 即使漏了失效 (如直接改库), 最多 30s 后自愈
+TTL_SECONDS = 30
+MAX_ENTRIES = 64
+
+_cache: dict[Hashable, tuple[float, dict]] = {}
+# 未命中时串行加载, 避免缓存刚过期时一批并发请求同时打库
+_lock = asyncio.Lock()
+# 每次 invalidate 自增; 加载期间发生失效则丢弃本次结果, 不把旧数据写回缓存
+_generation = 0
+
+
+def _get_fresh(key: Hashable) -> Optional[dict]:
+    entry = _cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+async def get_or_load(
+    key: Hashable,
+    loader: Callable[[], Awaitable[Optional[dict]]],
+) -> Optional[dict]:
+    """命中未过期缓存直接返回; 否则调用 loader 加载并缓存。loader 返回 None (问卷不存在) 不缓存。"""
+    value = _get_fresh(key)
+    if value is not None:
+        return value
+
+    async with _lock:
+        # 等锁期间可能已被前一个请求填好
+        value = _get_fresh(key)
+        if value is not None:
+            return value
+
+        generation = _generation
+        value = await loader()
+        if value is not None and generation == _generation:
+            if len(_cache) >= MAX_ENTRIES:
+                now = time.monotonic()
+                for k in [k for k, (expires, _) in _cache.items() if expires <= now]:
+                    del _cache[k]
+                if len(_cache) >= MAX_ENTRIES:
+                    _cache.clear()
+            _cache[key] = (time.monotonic() + TTL_SECONDS, value)
+        return value
+
+
+def invalidate() -> None:
+    """清空全部缓存 (管理端修改问卷/题目后调用)。"""
+    global _generation
+    _generation += 1
+    _cache.clear()
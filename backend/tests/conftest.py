@@ -0,0 +1,30 @@
+"""
+测试共用夹具: 每个测试一份独立的临时 SQLite 库。
+"""
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db import Base
+from app.models import Survey
+
+
+@pytest.fixture
+async def db_session(tmp_path):
+    """建表后的 AsyncSession (expire_on_commit=False, 同应用); 测试结束关闭会话并释放引擎"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)()
+    yield session
+    await session.close()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def survey(db_session) -> Survey:
+    """一份已入库的激活问卷 (不含题目)"""
+    survey = Survey(title="测试问卷", code="testcode", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+    await db_session.refresh(survey)
+    return survey
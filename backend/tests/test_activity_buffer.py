@@ -0,0 +1,29 @@
+"""
+活动日志写缓冲的单元测试: 记录只进内存, flush 时一次批量写入。
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.models import ActivityLog
+from app.services import ActivityService
+
+
+async def test_logs_are_buffered_then_bulk_inserted(db_session, monkeypatch):
+    monkeypatch.setattr(
+        "app.services.activity.async_session_maker",
+        async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False),
+    )
+    monkeypatch.setattr(ActivityService, "_pending", [])
+
+    ActivityService.log_submit("Alice", 1)
+    ActivityService.log_review("Alice", 1, "approved", operator="admin", note="ok")
+    # 时间戳在记录时取
+    assert all(row["created_at"] is not None for row in ActivityService._pending)
+    assert (await db_session.execute(select(ActivityLog))).scalars().all() == []
+
+    await ActivityService.flush()
+    assert ActivityService._pending == []
+    logs, total = await ActivityService.get_recent_activities(db_session)
+    assert total == 2
+    assert {log.action for log in logs} == {"submit", "approved"}
+    assert all(log.created_at is not None for log in logs)
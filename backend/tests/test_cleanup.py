@@ -10,21 +10,13 @@
 from datetime import datetime, timezone
 
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
-from app.db import Base
 from app.models import Survey, Question, Submission, Answer, UploadedFile
-from app.core.config import Settings, UploadSettings
+from app.core.config import Settings, UploadSettings, CleanupSettings
 from app.services.cleanup import CleanupService
 
 
-async def _make_session(tmp_path) -> AsyncSession:
-    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)()
-
-
 def _patch_upload_dir(monkeypatch, upload_dir):
     fake = Settings(upload=UploadSettings(path=str(upload_dir)))
     monkeypatch.setattr("app.services.cleanup.get_settings", lambda: fake)
@@ -82,36 +74,35 @@ async def _seed_reviewed_submission(session, upload_dir):
     return sub, ans_img, ans_txt
 
 
-async def test_cleanup_keeps_answers_clears_images(tmp_path, monkeypatch):
+async def test_cleanup_keeps_answers_clears_images(db_session, tmp_path, monkeypatch):
     upload_dir = tmp_path / "uploads"
     upload_dir.mkdir()
     _patch_upload_dir(monkeypatch, upload_dir)
 
-    session = await _make_session(tmp_path)
-    sub, ans_img, ans_txt = await _seed_reviewed_submission(session, upload_dir)
+    sub, ans_img, ans_txt = await _seed_reviewed_submission(db_session, upload_dir)
 
-    stats = await CleanupService.cleanup_reviewed_submissions(session)
+    stats = await CleanupService.cleanup_reviewed_submissions(db_session)
 
     # 图片磁盘文件被删
     assert not (upload_dir / "a.jpg").exists()
     assert not (upload_dir / "b.jpg").exists()
 
     # 答案行全部保留 (核心: 留答案)
-    remaining = (await session.execute(select(Answer))).scalars().all()
+    remaining = (await db_session.execute(select(Answer))).scalars().all()
     assert len(remaining) == 2
 
     # 图片引用被清空, 文本内容原样保留
-    await session.refresh(ans_img)
-    await session.refresh(ans_txt)
+    await db_session.refresh(ans_img)
+    await db_session.refresh(ans_txt)
     assert ans_img.content == {"images": []}
     assert ans_txt.content == {"text": "保留我"}
 
     # 提交元数据保留
-    await session.refresh(sub)
+    await db_session.refresh(sub)
     assert sub.status == "approved"
 
     # uploaded_files 记录被删
-    ufs = (await session.execute(select(UploadedFile))).scalars().all()
+    ufs = (await db_session.execute(select(UploadedFile))).scalars().all()
     assert len(ufs) == 0
 
     # 统计断言具体业务结果
@@ -120,49 +111,43 @@ async def test_cleanup_keeps_answers_clears_images(tmp_path, monkeypatch):
     assert stats["files_deleted"] == 2  # a.jpg + b.jpg (uploaded_files 的 a.jpg 已被前一步删, 不重复计)
     assert stats["bytes_freed"] == 7  # 3 + 4
 
-    await session.close()
 
-
-async def test_cleanup_is_idempotent_on_processed_submission(tmp_path, monkeypatch):
+async def test_cleanup_is_idempotent_on_processed_submission(db_session, tmp_path, monkeypatch):
     upload_dir = tmp_path / "uploads"
     upload_dir.mkdir()
     _patch_upload_dir(monkeypatch, upload_dir)
 
-    session = await _make_session(tmp_path)
-    await _seed_reviewed_submission(session, upload_dir)
+    await _seed_reviewed_submission(db_session, upload_dir)
 
-    await CleanupService.cleanup_reviewed_submissions(session)
-    stats2 = await CleanupService.cleanup_reviewed_submissions(session)
+    await CleanupService.cleanup_reviewed_submissions(db_session)
+    stats2 = await CleanupService.cleanup_reviewed_submissions(db_session)
 
     # 第二次无图可清, 不再计数, 答案仍在
     assert stats2["images_cleared"] == 0
     assert stats2["submissions_cleaned"] == 0
     assert stats2["files_deleted"] == 0
-    assert len((await session.execute(select(Answer))).scalars().all()) == 2
-
-    await session.close()
+    assert len((await db_session.execute(select(Answer))).scalars().all()) == 2
 
 
-async def test_cleanup_skips_pending_submission(tmp_path, monkeypatch):
+async def test_cleanup_skips_pending_submission(db_session, tmp_path, monkeypatch):
     upload_dir = tmp_path / "uploads"
     upload_dir.mkdir()
     _patch_upload_dir(monkeypatch, upload_dir)
 
-    session = await _make_session(tmp_path)
     survey = Survey(title="测试问卷", code="pendingcode", is_active=True)
-    session.add(survey)
-    await session.commit()
-    await session.refresh(survey)
+    db_session.add(survey)
+    await db_session.commit()
+    await db_session.refresh(survey)
 
     q_img = Question(survey_id=survey.id, title="上传图", type="image", order=1)
-    session.add(q_img)
-    await session.commit()
-    await session.refresh(q_img)
+    db_session.add(q_img)
+    await db_session.commit()
+    await db_session.refresh(q_img)
 
     sub = Submission(survey_id=survey.id, player_name="Bob", status="pending")
-    session.add(sub)
-    await session.commit()
-    await session.refresh(sub)
+    db_session.add(sub)
+    await db_session.commit()
+    await db_session.refresh(sub)
 
     (upload_dir / "keep.jpg").write_bytes(b"keepme")
     ans = Answer(
@@ -170,16 +155,219 @@ async def test_cleanup_skips_pending_submission(tmp_path, monkeypatch):
         question_id=q_img.id,
         content={"images": ["/uploads/keep.jpg"]},
     )
-    session.add(ans)
-    await session.commit()
+    db_session.add(ans)
+    await db_session.commit()
 
-    stats = await CleanupService.cleanup_reviewed_submissions(session)
+    stats = await CleanupService.cleanup_reviewed_submissions(db_session)
 
     # 未审核提交完全不动
     assert (upload_dir / "keep.jpg").exists()
-    await session.refresh(ans)
+    await db_session.refresh(ans)
     assert ans.content == {"images": ["/uploads/keep.jpg"]}
     assert stats["submissions_cleaned"] == 0
     assert stats["images_cleared"] == 0
 
-    await session.close()
+
+async def test_orphan_cleanup_keeps_files_referenced_by_answers(db_session, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    fake = Settings(
+        upload=UploadSettings(path=str(upload_dir)),
+        cleanup=CleanupSettings(orphan_file_hours=0),
+    )
+    monkeypatch.setattr("app.services.cleanup.get_settings", lambda: fake)
+
+    monkeypatch.setattr(
+        "app.services.cleanup.async_session_maker",
+        async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False),
+    )
+    sub, _, _ = await _seed_reviewed_submission(db_session, upload_dir)
+    (upload_dir / "orphan.jpg").write_bytes(b"x")
+    # 非数组的 images 不应被当作引用
+    db_session.add(Answer(submission_id=sub.id, question_id=1, content={"images": "orphan.jpg"}))
+    await db_session.commit()
+
+    stats = await CleanupService.cleanup_orphan_files()
+
+    # 答案引用的 a.jpg / b.jpg 与 uploaded_files 记录保留, 只删孤立文件
+    assert (upload_dir / "a.jpg").exists()
+    assert (upload_dir / "b.jpg").exists()
+    assert not (upload_dir / "orphan.jpg").exists()
+    assert stats["orphan_files_deleted"] == 1
+
+
+async def test_cleanup_keeps_image_shared_with_pending_submission(db_session, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    _patch_upload_dir(monkeypatch, upload_dir)
+
+    sub, ans_img, _ = await _seed_reviewed_submission(db_session, upload_dir)
+    # 内容去重后, 另一份待审提交引用了同一张 b.jpg
+    pending = Submission(survey_id=sub.survey_id, player_name="Bob", status="pending")
+    db_session.add(pending)
+    await db_session.commit()
+    await db_session.refresh(pending)
+    db_session.add(Answer(
+        submission_id=pending.id,
+        question_id=ans_img.question_id,
+        content={"images": ["/uploads/b.jpg"]},
+    ))
+    await db_session.commit()
+
+    stats = await CleanupService.cleanup_reviewed_submissions(db_session)
+
+    assert not (upload_dir / "a.jpg").exists()
+    assert (upload_dir / "b.jpg").exists()
+    # 仍在用的引用留在答案里, 下一轮再清
+    await db_session.refresh(ans_img)
+    assert ans_img.content == {"images": ["/uploads/b.jpg"]}
+    assert stats["images_cleared"] == 1
+    assert stats["files_deleted"] == 1
+
+
+async def test_cleanup_keeps_same_content_uploaded_by_another_player(db_session, tmp_path, monkeypatch):
+    import io
+
+    from fastapi import UploadFile
+    from starlette.datastructures import Headers
+
+    from app.schemas import SubmissionCreate
+    from app.services import FileService, SubmissionService
+
+    upload_dir = tmp_path / "uploads"
+    _patch_upload_dir(monkeypatch, upload_dir)
+    fake = Settings(upload=UploadSettings(path=str(upload_dir)))
+    monkeypatch.setattr("app.services.file.get_settings", lambda: fake)
+
+    survey = Survey(title="测试问卷", code="sharedcode", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+    q_img = Question(survey_id=survey.id, title="上传图", type="image", order=1)
+    db_session.add(q_img)
+    await db_session.commit()
+
+    def _upload():
+        return UploadFile(io.BytesIO(b"same"), filename="pic.png", headers=Headers({"content-type": "image/png"}))
+
+    async def _submit_and_review(uploaded):
+        data = SubmissionCreate(player_name="p", answers=[{
+            "question_id": q_img.id,
+            "content": {"images": [FileService.get_file_url(uploaded.stored_name)]},
+        }])
+        submission = await SubmissionService.create_submission(db_session, survey, data)
+        submission.status = "approved"
+        submission.reviewed_at = datetime.now(timezone.utc)
+        await db_session.commit()
+
+    # A、B 先后上传相同内容: 共用一个文件; A 提交并审核, B 尚未提交
+    first = await FileService.save_file(db_session, _upload())
+    second = await FileService.save_file(db_session, _upload())
+    await _submit_and_review(first)
+
+    await CleanupService.cleanup_reviewed_submissions(db_session)
+    assert (upload_dir / second.stored_name).exists()
+
+    # B 提交并审核后, 下一轮清理删除文件与全部记录
+    await _submit_and_review(second)
+    await CleanupService.cleanup_reviewed_submissions(db_session)
+    assert not (upload_dir / second.stored_name).exists()
+    assert (await db_session.execute(select(UploadedFile))).scalars().all() == []
+
+
+async def test_cleanup_ignores_stale_unclaimed_upload(db_session, tmp_path, monkeypatch):
+    from datetime import timedelta
+
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    _patch_upload_dir(monkeypatch, upload_dir)
+
+    await _seed_reviewed_submission(db_session, upload_dir)
+    # 超过孤立文件期限仍未关联的记录 (放弃的上传/旧版遗留) 不再占用文件
+    db_session.add(UploadedFile(
+        filename="dup.jpg",
+        stored_name="a.jpg",
+        file_path=str(upload_dir / "a.jpg"),
+        file_size=3,
+        mime_type="image/jpeg",
+        created_at=datetime.now(timezone.utc) - timedelta(hours=48),
+    ))
+    await db_session.commit()
+
+    stats = await CleanupService.cleanup_reviewed_submissions(db_session)
+
+    assert not (upload_dir / "a.jpg").exists()
+    assert stats["images_cleared"] == 2
+    assert stats["files_deleted"] == 2
+
+
+async def test_cleanup_ignores_upload_of_deleted_submission(db_session, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    _patch_upload_dir(monkeypatch, upload_dir)
+
+    sub, _, _ = await _seed_reviewed_submission(db_session, upload_dir)
+    # 共用 a.jpg 的另一份提交已随问卷删除, 其上传记录仍指向该提交: 不再算作占用
+    db_session.add(UploadedFile(
+        filename="other.jpg",
+        stored_name="a.jpg",
+        file_path=str(upload_dir / "a.jpg"),
+        file_size=3,
+        mime_type="image/jpeg",
+        submission_id=sub.id + 100,
+    ))
+    await db_session.commit()
+
+    stats = await CleanupService.cleanup_reviewed_submissions(db_session)
+
+    assert not (upload_dir / "a.jpg").exists()
+    assert stats["images_cleared"] == 2
+    assert stats["files_deleted"] == 2
+
+
+async def test_background_task_stops_while_waiting(tmp_path, monkeypatch):
+    import asyncio
+
+    _patch_upload_dir(monkeypatch, tmp_path / "uploads")
+    CleanupService.start_background_task()
+    task = CleanupService._task
+    await asyncio.sleep(0)
+
+    # 等待下次执行 (可能数小时) 期间收到停止信号应立即退出, 不必取消任务
+    await CleanupService.stop_background_task()
+    await asyncio.wait_for(task, timeout=1)
+    assert task.done() and not task.cancelled()
+
+
+async def test_background_task_stop_waits_for_running_cleanup(tmp_path, monkeypatch):
+    import asyncio
+
+    _patch_upload_dir(monkeypatch, tmp_path / "uploads")
+    started = asyncio.Event()
+    finished = []
+
+    async def _slow_cleanup():
+        started.set()
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return {}
+
+    monkeypatch.setattr(CleanupService, "run_cleanup", _slow_cleanup)
+    monkeypatch.setattr(CleanupService, "_next_run_after", lambda now, *_: now)
+    CleanupService.start_background_task()
+    task = CleanupService._task
+    await asyncio.wait_for(started.wait(), timeout=1)
+
+    # 进行中的清理应跑完 (照常提交) 再退出, 而不是被取消
+    await CleanupService.stop_background_task()
+    assert finished == [True]
+    assert task.done() and not task.cancelled()
+
+
+def test_next_run_keeps_local_wall_clock_hour():
+    now = datetime(2024, 3, 9, 5, 30).astimezone()
+    next_run = CleanupService._next_run_after(now, run_hour=3, interval_days=1)
+    assert (next_run.day, next_run.hour, next_run.minute) == (10, 3, 0)
+    assert next_run.tzinfo is not None
+
+    early = datetime(2024, 3, 9, 1, 0).astimezone()
+    assert CleanupService._next_run_after(early, 3, 1).day == 9
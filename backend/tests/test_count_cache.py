@@ -0,0 +1,43 @@
+"""
+列表总数缓存的单元测试: 大结果集总数短时复用, 小结果集始终精确。
+"""
+
+from app.models import Survey, Submission
+from app.services import SubmissionService, count_cache
+
+
+async def test_list_total_cached_only_above_threshold(db_session, monkeypatch):
+    monkeypatch.setattr(count_cache, "THRESHOLD", 3)
+    count_cache.invalidate()
+    survey = Survey(title="A", code="countcache", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+
+    async def add(name):
+        db_session.add(Submission(survey_id=survey.id, player_name=name))
+        await db_session.commit()
+
+    # 小于阈值: 每次都精确计数
+    await add("a")
+    _, total = await SubmissionService.get_submissions(db_session, 1, 10)
+    assert total == 1
+    await add("b")
+    _, total = await SubmissionService.get_submissions(db_session, 1, 10)
+    assert total == 2
+
+    # 达到阈值后缓存: TTL 内新增的提交暂不计入, 筛选条件不同则各自计数
+    await add("c")
+    _, total = await SubmissionService.get_submissions(db_session, 1, 10)
+    assert total == 3
+    await add("d")
+    _, total = await SubmissionService.get_submissions(db_session, 1, 10)
+    assert total == 3
+    _, total = await SubmissionService.get_submissions(db_session, 1, 10, status="pending")
+    assert total == 4
+    # 统计接口不走缓存
+    assert await SubmissionService.count_submissions(db_session) == 4
+
+    count_cache.invalidate()
+    _, total = await SubmissionService.get_submissions(db_session, 1, 10)
+    assert total == 4
+    count_cache.invalidate()
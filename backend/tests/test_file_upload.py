@@ -0,0 +1,70 @@
+"""
+上传分块写盘的单元测试: 正常保存 / 超限中止且不留半截文件 / 相同内容去重。
+"""
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.core.config import Settings, UploadSettings
+from app.services import FileService
+from app.services import file as file_module
+
+
+def _patch_upload(monkeypatch, upload_dir, max_size_mb=1):
+    fake = Settings(upload=UploadSettings(path=str(upload_dir), max_size_mb=max_size_mb))
+    monkeypatch.setattr("app.services.file.get_settings", lambda: fake)
+
+
+def _upload(data: bytes, size=None) -> UploadFile:
+    return UploadFile(
+        io.BytesIO(data),
+        size=size,
+        filename="pic.png",
+        headers=Headers({"content-type": "image/png"}),
+    )
+
+
+async def test_save_file_streams_in_chunks(db_session, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    _patch_upload(monkeypatch, upload_dir)
+    monkeypatch.setattr(file_module, "CHUNK_SIZE", 7)
+
+    data = b"0123456789" * 10
+    uploaded = await FileService.save_file(db_session, _upload(data))
+    assert uploaded.file_size == len(data)
+    assert (upload_dir / uploaded.stored_name).read_bytes() == data
+
+
+async def test_save_file_rejects_oversize_without_leftover(db_session, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    _patch_upload(monkeypatch, upload_dir, max_size_mb=1)
+
+    # 未提供 size: 写入途中超限中止
+    with pytest.raises(HTTPException) as exc:
+        await FileService.save_file(db_session, _upload(b"x" * ((1 << 20) + 1)))
+    assert exc.value.status_code == 400
+    assert list(upload_dir.iterdir()) == []
+
+    # 提供 size: 直接拒绝
+    with pytest.raises(HTTPException):
+        await FileService.save_file(db_session, _upload(b"x", size=(1 << 20) + 1))
+    assert list(upload_dir.iterdir()) == []
+
+
+async def test_save_file_dedups_identical_content(db_session, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    _patch_upload(monkeypatch, upload_dir)
+
+    first = await FileService.save_file(db_session, _upload(b"same-bytes"))
+    second = await FileService.save_file(db_session, _upload(b"same-bytes"))
+    other = await FileService.save_file(db_session, _upload(b"other-bytes"))
+
+    # 相同内容共用一个文件, 但每次上传各有一条记录; 不遗留临时文件
+    assert second.id != first.id
+    assert second.stored_name == first.stored_name
+    assert other.stored_name != first.stored_name
+    assert sorted(p.name for p in upload_dir.iterdir()) == sorted(
+        [first.stored_name, other.stored_name]
+    )
@@ -0,0 +1,66 @@
+"""
+JWT 验签缓存的单元测试: 命中缓存 / 缓存中的 token 过期后仍被拒绝 / 篡改签名被拒绝。
+"""
+import json
+import time
+
+from app.core import jwt as jwt_module
+from app.core.config import Settings, AuthSettings
+from app.core.jwt import JwtUtil
+
+
+def _patch_secret(monkeypatch, secret="unit-test-secret"):
+    fake = Settings(auth=AuthSettings(jwt_secret=secret))
+    monkeypatch.setattr("app.core.jwt.get_settings", lambda: fake)
+    jwt_module._secret_bytes.cache_clear()
+    jwt_module._verify_signed.cache_clear()
+
+
+def _make_token(exp: int) -> str:
+    header = JwtUtil._base64url_encode(json.dumps({"alg": "HS256", "typ": "JWT"}))
+    payload = JwtUtil._base64url_encode(json.dumps(
+        {"sub": "admin", "adminId": 1, "iat": int(time.time()), "exp": exp, "jti": "j1"}
+    ))
+    data = f"{header}.{payload}"
+    return f"{data}.{JwtUtil._create_signature(data)}"
+
+
+def test_verify_hits_cache(monkeypatch):
+    _patch_secret(monkeypatch)
+    token = _make_token(int(time.time()) + 3600)
+
+    first = JwtUtil.verify_and_decode(token)
+    second = JwtUtil.verify_and_decode(token)
+    assert first is not None and first.sub == "admin"
+    assert second is first
+    assert jwt_module._verify_signed.cache_info().hits == 1
+
+
+def test_cached_token_rejected_after_expiry(monkeypatch):
+    _patch_secret(monkeypatch)
+    exp = int(time.time()) + 60
+    token = _make_token(exp)
+    assert JwtUtil.verify_and_decode(token) is not None
+
+    # 缓存仍在, 但过期判断每次重新进行
+    monkeypatch.setattr(jwt_module.time, "time", lambda: exp + 1)
+    assert JwtUtil.verify_and_decode(token) is None
+
+
+def test_tampered_signature_rejected(monkeypatch):
+    _patch_secret(monkeypatch)
+    token = _make_token(int(time.time()) + 3600)
+    assert JwtUtil.verify_and_decode(token[:-2] + "AA") is None
+
+
+def test_non_ascii_signature_rejected(monkeypatch):
+    _patch_secret(monkeypatch)
+    header, payload, _ = _make_token(int(time.time()) + 3600).split(".")
+    assert JwtUtil.verify_and_decode(f"{header}.{payload}.签名") is None
+
+
+def test_malformed_token_skips_cache(monkeypatch):
+    _patch_secret(monkeypatch)
+    for junk in ("", "a.b", "a.b.c.d", "a.b.c d", "a..c"):
+        assert JwtUtil.verify_and_decode(junk) is None
+    assert jwt_module._verify_signed.cache_info().currsize == 0
@@ -0,0 +1,75 @@
+"""
+列表接口 SQLite json_object 投影的回归测试: 与 ORM 路径输出的字段/格式一致。
+"""
+from datetime import datetime
+
+import orjson
+
+from app.models import Survey, Submission, ActivityLog
+from app.core.responses import ORJSONResponse
+from app.services import SubmissionService, ActivityService, SurveyService
+
+
+def _encode(value):
+    return orjson.loads(ORJSONResponse(value).body)
+
+
+async def test_submissions_json_matches_orm(db_session):
+    survey = Survey(title='含"引号"的问卷', code="projcode", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+    db_session.add_all([
+        Submission(survey_id=survey.id, player_name="Alice", in_review_group=True,
+                   created_at=datetime(2024, 1, 2, 3, 4, 5, 678000)),
+        Submission(survey_id=survey.id, player_name="Bob", status="approved", qq="10001",
+                   created_at=datetime(2024, 1, 3), reviewed_at=datetime(2024, 1, 4)),
+        Submission(survey_id=survey.id, player_name="Carol", in_review_group=False,
+                   created_at=datetime(2024, 1, 5)),
+    ])
+    await db_session.commit()
+
+    rows, total = await SubmissionService.get_submissions_json(db_session, 1, 20)
+    subs, orm_total = await SubmissionService.get_submissions(db_session, 1, 20)
+    assert total == orm_total == 3
+    assert [orjson.loads(r) for r in rows] == [_encode(s) for s in subs]
+    assert subs[0]["survey_title"] == '含"引号"的问卷'
+
+
+async def test_activities_json_filters_and_escapes(db_session):
+    db_session.add_all([
+        ActivityLog(action="submit", player_name='A\n"x', submission_id=1),
+        ActivityLog(action="approved", player_name="B", operator="admin", note="ok"),
+    ])
+    await db_session.commit()
+
+    rows, total = await ActivityService.get_recent_activities_json(db_session, action="submit")
+    assert total == 1
+    log = orjson.loads(rows[0])
+    assert log["player_name"] == 'A\n"x'
+    assert log["operator"] is None and log["submission_id"] == 1
+
+
+async def test_activities_total_from_window_count(db_session):
+    db_session.add_all([ActivityLog(action="submit", player_name=f"P{i}") for i in range(5)])
+    db_session.add(ActivityLog(action="approved", player_name="Q"))
+    await db_session.commit()
+
+    logs, total = await ActivityService.get_recent_activities(db_session, limit=2, action="submit")
+    assert len(logs) == 2 and total == 5
+    rows, total = await ActivityService.get_recent_activities_json(db_session, limit=2, offset=4)
+    assert len(rows) == 2 and total == 6
+    # offset 越过末尾: 页为空但总数仍正确
+    logs, total = await ActivityService.get_recent_activities(db_session, offset=10, action="submit")
+    assert logs == [] and total == 5
+
+
+async def test_survey_stats_single_grouped_query(db_session):
+    db_session.add_all([
+        Survey(title="A", code="statsa", is_active=True),
+        Survey(title="B", code="statsb", is_active=True),
+        Survey(title="C", code="statsc", is_active=False),
+    ])
+    await db_session.commit()
+
+    stats = await SurveyService.get_survey_stats(db_session)
+    assert stats == {"active": 2, "inactive": 1, "total": 3}
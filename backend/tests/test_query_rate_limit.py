@@ -1,6 +1,8 @@
 """
 查询端点 per-IP per-minute 限流单元测试 (默认 rate_limit.enabled=True)。
 """
+import time
+
 import pytest
 from fastapi import HTTPException
 
@@ -22,3 +24,79 @@ async def test_skips_when_no_ip():
     # 取不到 IP 时放行, 不抛
     await check_query_rate_limit(None)
     await check_query_rate_limit("")
+
+
+def _clear_memory(rate_limit) -> None:
+    for bucket in rate_limit._cache.values():
+        bucket.clear()
+    rate_limit._submission_codes.clear()
+    rate_limit._pending.clear()
+
+
+@pytest.fixture
+async def limiter(tmp_path, monkeypatch):
+    from app.core import rate_limit
+
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_DB", tmp_path / "rate_limit.db")
+    _clear_memory(rate_limit)
+    await rate_limit.load()
+    yield rate_limit
+    await rate_limit.stop_persist_task()  # 关闭事件库, 下个测试重新加载
+    _clear_memory(rate_limit)
+
+
+async def test_regcode_limit_checks_and_records_in_one_call(limiter):
+    ip = "203.0.113.8"
+    for _ in range(limiter.MAX_REGCODE_ATTEMPTS_PER_DAY):
+        await limiter.consume_regcode_rate_limit(ip)
+    with pytest.raises(HTTPException) as exc:
+        await limiter.consume_regcode_rate_limit(ip)
+    assert exc.value.status_code == 429
+    # 超限请求不计数
+    assert len(limiter._cache["regcodes"][ip]) == limiter.MAX_REGCODE_ATTEMPTS_PER_DAY
+
+
+async def test_events_survive_restart(limiter):
+    ip = "203.0.113.9"
+    await limiter.record_ip_submission(ip, "abc")
+    await limiter.record_ip_upload(ip)
+    # 请求路径只进待写缓冲, 由后台任务批量落盘
+    assert len(limiter._pending) == 2
+    await limiter.flush()
+    assert limiter._pending == []
+
+    # 过期记录在清理时从内存与库中删除
+    limiter._append("uploads", "203.0.113.10", time.time() - limiter.WINDOW_SECONDS - 1)
+    await limiter.flush()
+    await limiter.prune()
+    assert "203.0.113.10" not in limiter._cache["uploads"]
+
+    # 模拟重启: 关闭后清空内存, 从库中重新载入
+    await limiter.record_ip_submission(ip, "def")
+    await limiter.stop_persist_task()
+    _clear_memory(limiter)
+    await limiter.load()
+    assert list(limiter._submission_codes[ip]) == ["abc", "def"]
+    assert len(limiter._cache["uploads"][ip]) == 1
+    assert "203.0.113.10" not in limiter._cache["uploads"]
+
+
+async def test_failed_flush_requeues_events(limiter, monkeypatch):
+    ip = "203.0.113.11"
+    await limiter.record_ip_upload(ip)
+
+    async def _fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    # 写库失败: 批次放回待写缓冲, 不静默丢失
+    executemany = limiter._db.executemany
+    monkeypatch.setattr(limiter._db, "executemany", _fail)
+    with pytest.raises(OSError):
+        await limiter.flush()
+    assert [row[:2] for row in limiter._pending] == [("uploads", ip)]
+
+    monkeypatch.setattr(limiter._db, "executemany", executemany)
+    await limiter.flush()
+    assert limiter._pending == []
+    async with limiter._db.execute("SELECT COUNT(*) FROM rate_limit_events WHERE ip = ?", (ip,)) as cursor:
+        assert (await cursor.fetchone())[0] == 1
@@ -0,0 +1,33 @@
+"""
+题目字段入库转换的单元测试: 嵌套选项/规则整体 dump, 部分更新时仍补齐嵌套默认值。
+"""
+
+from app.models import Survey
+from app.schemas import QuestionCreate, QuestionUpdate
+from app.services import QuestionService
+
+
+async def test_add_and_update_question_dump_nested(db_session):
+    survey = Survey(title="A", code="dumpa", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+    await db_session.refresh(survey)
+
+    question = await QuestionService.add_question(db_session, survey.id, QuestionCreate(
+        title="q", type="single", options=[{"value": "a", "label": "A"}],
+        validation={"max_length": 5},
+    ))
+    assert question.options == [{"value": "a", "label": "A"}]
+    assert question.validation == {"min_length": None, "max_length": 5, "max_images": None}
+    assert question.condition is None
+
+    # 只传了部分嵌套字段: 其余嵌套字段按默认值写入, 未传的顶层字段不动
+    question = await QuestionService.update_question(
+        db_session, question, QuestionUpdate(validation={"max_images": 3})
+    )
+    assert question.validation == {"min_length": None, "max_length": None, "max_images": 3}
+    assert question.options == [{"value": "a", "label": "A"}]
+    assert question.title == "q"
+
+    blank = await QuestionService.add_question(db_session, survey.id, QuestionCreate(title="t", type="text", options=[]))
+    assert blank.options is None
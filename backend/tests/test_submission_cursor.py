@@ -0,0 +1,47 @@
+"""
+审核列表游标分页的单元测试: ORM 与 json_object 两条路径按游标翻页都与 OFFSET 分页结果一致。
+"""
+from datetime import datetime
+
+import orjson
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models import Survey, Submission
+from app.services import SubmissionService
+
+
+async def test_submission_cursor_pages_match_offset_pages(db_session):
+    survey = Survey(title="A", code="subcursor", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+    # 含相同 created_at 与整秒时间戳, 验证按 id 打破平局及 iso 文本回解
+    stamps = [datetime(2026, 1, 1), datetime(2026, 1, 2, 8, 0, 0, 250)] * 3
+    db_session.add_all([
+        Submission(survey_id=survey.id, player_name=f"P{i}", created_at=ts)
+        for i, ts in enumerate(stamps)
+    ])
+    await db_session.commit()
+
+    expected, total = await SubmissionService.get_submissions(db_session, 1, 10)
+    assert total == 6
+
+    seen, after = [], None
+    while True:
+        page, total = await SubmissionService.get_submissions(db_session, 1, 4, after=after)
+        if not page:
+            break
+        assert (total is None) == (after is not None)
+        seen.extend(page)
+        after = decode_cursor(encode_cursor(page[-1]["created_at"], page[-1]["id"]))
+    assert [r["id"] for r in seen] == [r["id"] for r in expected]
+
+    seen, after = [], None
+    while True:
+        rows, _ = await SubmissionService.get_submissions_json(db_session, 1, 4, after=after)
+        if not rows:
+            break
+        page = [orjson.loads(r) for r in rows]
+        seen.extend(page)
+        last = page[-1]
+        after = decode_cursor(encode_cursor(datetime.fromisoformat(last["created_at"]), last["id"]))
+    assert [r["id"] for r in seen] == [r["id"] for r in expected]
@@ -0,0 +1,65 @@
+"""
+提交统计查询的单元测试。
+"""
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.schemas import SubmissionCreate
+from app.services import SubmissionService
+
+
+async def _make_submission(session, survey, player_name, status="pending"):
+    sub = await SubmissionService.create_submission(
+        session, survey, SubmissionCreate(answers=[]), player_name=player_name
+    )
+    if status != "pending":
+        sub.status = status
+        await session.commit()
+    return sub
+
+
+async def test_status_counts_groups_by_status(db_session, survey):
+    await _make_submission(db_session, survey, "Alice")
+    await _make_submission(db_session, survey, "Bob")
+    await _make_submission(db_session, survey, "Carol", status="approved")
+
+    counts = await SubmissionService.get_status_counts(db_session)
+    assert counts == {"pending": 2, "approved": 1}
+    # 没有提交的状态不出现, 调用方用 .get(..., 0) 兜底
+    assert counts.get("rejected", 0) == 0
+
+
+async def test_status_counts_empty(db_session):
+    assert await SubmissionService.get_status_counts(db_session) == {}
+
+
+async def test_count_submissions_matches_list_total(db_session, survey):
+    await _make_submission(db_session, survey, "Alice")
+    await _make_submission(db_session, survey, "Alicia", status="approved")
+    await _make_submission(db_session, survey, "Bob")
+
+    assert await SubmissionService.count_submissions(db_session) == 3
+    assert await SubmissionService.count_submissions(db_session, status="pending") == 2
+    assert await SubmissionService.count_submissions(db_session, survey_id=survey.id + 1) == 0
+
+    items, total = await SubmissionService.get_submissions(db_session, 1, 1, player_name="Ali")
+    assert total == 2 and len(items) == 1
+    assert total == await SubmissionService.count_submissions(db_session, player_name="Ali")
+
+
+async def test_mark_viewed_keeps_first_viewed_at(db_session, survey, monkeypatch):
+    monkeypatch.setattr(
+        "app.services.survey.async_session_maker",
+        async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False),
+    )
+    sub = await _make_submission(db_session, survey, "Alice")
+
+    first = datetime(2024, 1, 1, 8, 0)
+    await SubmissionService.mark_viewed(sub.id, first)
+    # 再次打开不覆盖首次查看时间
+    await SubmissionService.mark_viewed(sub.id, datetime(2024, 1, 2, 8, 0))
+
+    db_session.expunge_all()
+    loaded = await SubmissionService.get_submission_by_id(db_session, sub.id)
+    assert loaded.first_viewed_at == first
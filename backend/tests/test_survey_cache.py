@@ -0,0 +1,66 @@
+"""
+公开问卷读缓存与抽题逻辑的单元测试。
+"""
+from app.services import SubmissionService, survey_cache
+
+
+async def test_get_or_load_caches_until_invalidated():
+    survey_cache.invalidate()
+    calls = []
+
+    async def _load():
+        calls.append(1)
+        return {"code": "abc"}
+
+    assert await survey_cache.get_or_load(("code", "abc"), _load) == {"code": "abc"}
+    assert await survey_cache.get_or_load(("code", "abc"), _load) == {"code": "abc"}
+    assert len(calls) == 1
+
+    survey_cache.invalidate()
+    await survey_cache.get_or_load(("code", "abc"), _load)
+    assert len(calls) == 2
+    survey_cache.invalidate()
+
+
+async def test_get_or_load_does_not_cache_missing():
+    survey_cache.invalidate()
+    calls = []
+
+    async def _load():
+        calls.append(1)
+        return None
+
+    assert await survey_cache.get_or_load(("active",), _load) is None
+    assert await survey_cache.get_or_load(("active",), _load) is None
+    assert len(calls) == 2
+
+
+async def test_invalidate_during_load_discards_result():
+    survey_cache.invalidate()
+
+    async def _stale_load():
+        # 加载期间管理员改了问卷: 本次结果不应写回缓存
+        survey_cache.invalidate()
+        return {"v": "old"}
+
+    async def _fresh_load():
+        return {"v": "new"}
+
+    assert await survey_cache.get_or_load(("active",), _stale_load) == {"v": "old"}
+    assert await survey_cache.get_or_load(("active",), _fresh_load) == {"v": "new"}
+    survey_cache.invalidate()
+
+
+def test_pick_questions_keeps_pinned_and_order():
+    items = ["a", "b", "c", "d", "e"]
+    pinned = [False, True, False, False, True]
+    for _ in range(20):
+        picked = SubmissionService.pick_questions(items, pinned, 3)
+        assert len(picked) == 3
+        assert "b" in picked and "e" in picked
+        assert picked == sorted(picked, key=items.index)
+
+    # random_count 不足以容纳保留题时, 只返回保留题
+    assert SubmissionService.pick_questions(items, pinned, 1) == ["b", "e"]
+    # random_count 覆盖全部题目时原样返回
+    assert SubmissionService.pick_questions(items, pinned, 10) == items
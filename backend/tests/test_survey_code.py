@@ -0,0 +1,37 @@
+"""
+问卷访问码撞码重试的单元测试。
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Survey, Question
+from app.schemas import SurveyCreate
+from app.services import SurveyService
+
+
+async def test_create_survey_retries_on_code_collision(db_session, monkeypatch):
+    db_session.add(Survey(title="已有", code="TAKEN234"))
+    await db_session.commit()
+
+    # 前两次生成撞上已有访问码, 第三次换到新码
+    codes = iter(["TAKEN234", "TAKEN234", "FRESH567"])
+    monkeypatch.setattr("app.services.survey._generate_code", lambda: next(codes))
+
+    survey = await SurveyService.create_survey(
+        db_session, SurveyCreate(title="新问卷", questions=[{"title": "q", "type": "text"}])
+    )
+
+    assert survey.code == "FRESH567"
+    assert (await db_session.scalars(select(Survey.code).order_by(Survey.id))).all() == ["TAKEN234", "FRESH567"]
+    assert (await db_session.scalars(select(Question.survey_id))).all() == [survey.id]
+
+
+async def test_create_survey_gives_up_after_repeated_collisions(db_session, monkeypatch):
+    db_session.add(Survey(title="已有", code="TAKEN234"))
+    await db_session.commit()
+    monkeypatch.setattr("app.services.survey._generate_code", lambda: "TAKEN234")
+
+    with pytest.raises(IntegrityError):
+        await SurveyService.create_survey(db_session, SurveyCreate(title="新问卷"))
+
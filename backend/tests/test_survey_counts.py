@@ -0,0 +1,30 @@
+"""
+问卷列表投影计数的单元测试。
+"""
+
+from app.models import Survey, Question, Submission
+from app.services import SurveyService
+
+
+async def test_survey_counts_grouped_per_survey(db_session):
+    a = Survey(title="A", code="counta", is_active=True)
+    b = Survey(title="B", code="countb", is_active=True)
+    empty = Survey(title="C", code="countc", is_active=True)
+    db_session.add_all([a, b, empty])
+    await db_session.commit()
+    db_session.add_all([
+        Question(survey_id=a.id, title="q1", type="text", order=0),
+        Question(survey_id=a.id, title="q2", type="text", order=1),
+        Question(survey_id=b.id, title="q1", type="text", order=0),
+        Submission(survey_id=a.id, player_name="Alice"),
+        Submission(survey_id=b.id, player_name="Bob"),
+        Submission(survey_id=b.id, player_name="Carol"),
+    ])
+    await db_session.commit()
+
+    # 列表投影同一条查询带出每个问卷的 (问题数, 提交数)
+    rows, total = await SurveyService.get_surveys(db_session, 1, 10)
+    assert total == 3
+    assert {r.id: (r.question_count, r.submission_count) for r in rows} == {
+        a.id: (2, 1), b.id: (1, 2), empty.id: (0, 0),
+    }
@@ -0,0 +1,29 @@
+"""
+问卷列表游标分页的单元测试。
+"""
+from datetime import datetime
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models import Survey
+from app.services import SurveyService
+
+
+async def test_cursor_pages_match_offset_pages(db_session):
+    # 含相同 created_at 的问卷, 验证按 id 打破平局
+    stamps = [datetime(2026, 1, d, 12, 0, 0, 500) for d in (1, 2, 2, 2, 3)]
+    db_session.add_all([
+        Survey(title=f"S{i}", code=f"cursor{i}", is_active=True, created_at=ts)
+        for i, ts in enumerate(stamps)
+    ])
+    await db_session.commit()
+
+    expected, total = await SurveyService.get_surveys(db_session, 1, 10)
+    assert total == 5
+
+    seen = []
+    page, _ = await SurveyService.get_surveys(db_session, 1, 2)
+    while page:
+        seen.extend(page)
+        cursor = decode_cursor(encode_cursor(page[-1].created_at, page[-1].id))
+        page = await SurveyService.get_surveys_after(db_session, cursor, 2)
+    assert [s.id for s in seen] == [s.id for s in expected]
@@ -0,0 +1,54 @@
+"""
+删除问卷的单元测试: 子表按 Core DELETE 一并删除, 不影响其他问卷。
+"""
+from sqlalchemy import func, select
+
+from app.models import Survey, Question, Submission, Answer, UploadedFile, BotNotification
+from app.services import SurveyService
+
+
+async def _seed(session, code):
+    survey = Survey(title=code, code=code, is_active=True)
+    session.add(survey)
+    await session.commit()
+    question = Question(survey_id=survey.id, title="q", type="text", order=0)
+    submission = Submission(survey_id=survey.id, player_name="Alice")
+    session.add_all([question, submission])
+    await session.commit()
+    session.add_all([
+        Answer(submission_id=submission.id, question_id=question.id, content={"text": "x"}),
+        UploadedFile(
+            filename="a.jpg", stored_name=f"{code}.jpg", file_path=f"uploads/{code}.jpg",
+            file_size=1, mime_type="image/jpeg", submission_id=submission.id,
+        ),
+        BotNotification(submission_id=submission.id, qq="10001", type="submit"),
+    ])
+    await session.commit()
+    return survey
+
+
+async def _count(session, model, **where):
+    query = select(func.count()).select_from(model).filter_by(**where)
+    return await session.scalar(query)
+
+
+async def test_delete_survey_removes_children_only(db_session):
+    doomed = await _seed(db_session, "deletea")
+    kept = await _seed(db_session, "deleteb")
+
+    assert await SurveyService.delete_survey(db_session, doomed.id)
+
+    assert await _count(db_session, Survey) == 1
+    assert await _count(db_session, Question, survey_id=doomed.id) == 0
+    assert await _count(db_session, Submission, survey_id=doomed.id) == 0
+    assert await _count(db_session, Answer) == 1
+    assert await _count(db_session, Question, survey_id=kept.id) == 1
+    # 不留指向已删提交的行
+    live_ids = select(Submission.id)
+    for model in (Answer, UploadedFile, BotNotification):
+        dangling = select(func.count()).select_from(model).where(model.submission_id.notin_(live_ids))
+        assert await db_session.scalar(dangling) == 0
+        assert await _count(db_session, model) == 1
+
+    # 再删一次: 问卷已不存在
+    assert not await SurveyService.delete_survey(db_session, doomed.id)
@@ -0,0 +1,51 @@
+"""
+问卷详情 ETag 的单元测试: 题目增删改都应刷新问卷版本。
+"""
+
+from app.api.surveys import _survey_etag
+from app.models import Survey
+from app.schemas import QuestionCreate, QuestionUpdate, SurveyUpdate
+from app.services import QuestionService, SurveyService
+
+
+async def test_question_changes_refresh_survey_etag(db_session):
+    survey = Survey(title="A", code="etaga", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+    await db_session.refresh(survey)
+    etag = _survey_etag(survey)
+    # 未变更时 ETag 稳定
+    assert _survey_etag(survey) == etag
+
+    seen = {etag}
+    question = await QuestionService.add_question(
+        db_session, survey.id, QuestionCreate(title="q1", type="text", order=0)
+    )
+    await db_session.refresh(survey)
+    seen.add(_survey_etag(survey))
+
+    question = await QuestionService.update_question(db_session, question, QuestionUpdate(title="q1'"))
+    await db_session.refresh(survey)
+    seen.add(_survey_etag(survey))
+
+    await db_session.refresh(question, ["answers"])
+    await QuestionService.delete_question(db_session, question)
+    await db_session.refresh(survey)
+    seen.add(_survey_etag(survey))
+
+    assert len(seen) == 4
+
+
+async def test_update_survey_single_statement_refreshes_etag(db_session):
+    survey = Survey(title="A", code="etagb", is_active=True)
+    db_session.add(survey)
+    await db_session.commit()
+    etag = _survey_etag(survey)
+
+    assert await SurveyService.update_survey(db_session, survey.id, SurveyUpdate(is_active=False))
+    await db_session.refresh(survey)
+    assert survey.is_active is False and survey.title == "A"
+    assert _survey_etag(survey) != etag
+
+    # 不存在的问卷不写入
+    assert not await SurveyService.update_survey(db_session, survey.id + 1, SurveyUpdate(title="B"))
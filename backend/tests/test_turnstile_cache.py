@@ -0,0 +1,122 @@
+"""
+Turnstile 已验证 token 短期缓存的单元测试 (不访问 Cloudflare)。
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from starlette.requests import Request
+
+from app.api.public import submit_survey
+from app.core import security, rate_limit
+from app.core.config import HotConfig
+from app.db import Base
+from app.models import Survey, Question, Submission
+from app.schemas import SubmissionCreate
+from app.services import ActivityService
+
+IP = "203.0.113.9"
+
+
+def test_verified_token_taken_once():
+    key = security._verified_key("tok-abc", IP)
+    assert not security._take_verified(key)
+
+    security._remember_verified(key)
+    # 换 IP 不命中: 缓存键绑定 token + IP
+    assert not security._take_verified(security._verified_key("tok-abc", "203.0.113.10"))
+    # 命中即取走, 同一 token 不能再次免验证
+    assert security._take_verified(key)
+    assert not security._take_verified(key)
+
+
+def test_expired_entry_is_dropped(monkeypatch):
+    key = security._verified_key("tok-old", None)
+    security._remember_verified(key)
+    monkeypatch.setattr(security.time, "monotonic", lambda: float("inf"))
+    assert not security._take_verified(key)
+    assert key not in security._verified
+
+
+class _RejectingClient:
+    """模拟 Cloudflare: token 已被用过, 重新验证一律失败"""
+
+    async def post(self, *args, **kwargs):
+        await asyncio.sleep(0)
+
+        class _Response:
+            def json(self):
+                return {"success": False, "error-codes": ["timeout-or-duplicate"]}
+
+        return _Response()
+
+
+def _request() -> Request:
+    return Request({"type": "http", "headers": [(b"x-real-ip", IP.encode())]})
+
+
+@pytest.fixture
+def turnstile_on(monkeypatch):
+    hot = HotConfig(
+        rate_limit_enabled=False,
+        max_submissions_per_day=10,
+        turnstile_enabled=True,
+        turnstile_secret_key="secret",
+        time_check_enabled=False,
+        min_submit_time=0,
+        debug=False,
+    )
+    monkeypatch.setattr(security, "get_hot_config", lambda: hot)
+    monkeypatch.setattr(rate_limit, "get_hot_config", lambda: hot)
+    monkeypatch.setattr(security, "get_http_client", lambda: _RejectingClient())
+    monkeypatch.setattr(ActivityService, "_pending", [])
+
+
+async def _seed(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    make_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with make_session() as session:
+        survey = Survey(title="t", code="turnstile1", is_active=True)
+        session.add(survey)
+        await session.commit()
+        session.add(Question(survey_id=survey.id, title="q", type="text", order=0, is_required=False))
+        await session.commit()
+    return make_session
+
+
+async def _submit(make_session, data):
+    async with make_session() as session:
+        return await submit_survey("turnstile1", data, _request(), session)
+
+
+async def test_cached_token_admits_one_concurrent_submit(tmp_path, turnstile_on):
+    make_session = await _seed(tmp_path)
+    security._remember_verified(security._verified_key("tok-once", IP))
+    data = SubmissionCreate(player_name="Alice", answers=[], turnstile_token="tok-once")
+
+    results = await asyncio.gather(
+        _submit(make_session, data), _submit(make_session, data), return_exceptions=True
+    )
+
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1 and rejected[0].status_code == 400
+    async with make_session() as session:
+        assert await session.scalar(select(func.count()).select_from(Submission)) == 1
+
+
+async def test_local_rejection_keeps_token_for_retry(tmp_path, turnstile_on):
+    make_session = await _seed(tmp_path)
+    security._remember_verified(security._verified_key("tok-retry", IP))
+
+    # 缺玩家名被本地拒绝: token 未被使用, 放回缓存
+    with pytest.raises(HTTPException, match="缺少玩家名"):
+        await _submit(make_session, SubmissionCreate(answers=[], turnstile_token="tok-retry"))
+
+    fixed = SubmissionCreate(player_name="Bob", answers=[], turnstile_token="tok-retry")
+    await _submit(make_session, fixed)
+    with pytest.raises(HTTPException):
+        await _submit(make_session, fixed)